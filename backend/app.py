@@ -1,22 +1,54 @@
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, jsonify, request, send_from_directory, g, has_request_context, Response
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 from flask_caching import Cache # type: ignore
 from flask_jwt_extended import create_access_token, JWTManager, jwt_required, get_jwt_identity, verify_jwt_in_request
 import boto3
+import markdown
+import nh3
+import html
 import psycopg2
 from flask import make_response
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+import psycopg2.errors
 import psycopg2.extras
+import psycopg2.pool
 import os
+import click
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
+from werkzeug.http import is_resource_modified
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.wsgi import wrap_file
+from werkzeug.middleware.proxy_fix import ProxyFix
+from itsdangerous import URLSafeTimedSerializer
+from urllib.parse import quote
+from xml.sax.saxutils import escape as xml_escape
+import mimetypes
 import random
 import string
+import bisect
+from array import array
+import time
+import re
+import json
+import hashlib
+import logging
+import threading
+import atexit
+import itertools
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 
 # --- App Initialization & Config ---
-app = Flask(__name__, static_folder='uploads', static_url_path='/uploads')
-CORS(app, resources={r"/*": {"origins": "http://localhost:5173"}})
+app = Flask(__name__, static_folder=None)  # Uploads are served by serve_upload (Range/ETag/sendfile aware)
+# Number of reverse proxies in front of the app. Their X-Forwarded-For/-Proto are trusted, so
+# request.remote_addr is the real client (anonymous view dedupe is keyed on it). 0 = served directly.
+TRUSTED_PROXIES = int(os.getenv('TRUSTED_PROXIES', '0'))
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+CORS(app, resources={r"/*": {"origins": "http://localhost:5173"}}, supports_credentials=True)
 bcrypt = Bcrypt(app)
 app.config["JWT_SECRET_KEY"] = "your-super-secret-key-for-development"
 jwt = JWTManager(app)
@@ -31,13 +63,29 @@ cache = Cache(app)
 def invalidate_post_caches(post_id=None):
     """Helper function to invalidate relevant caches when a post is modified"""
     cache.delete('all_posts')  # Always invalidate the main posts list
-    cache.delete('popular_posts')  # Invalidate popular posts cache if we implement it
+    cache.delete('popular_posts')  # Starts a new generation of cached popular pages
     if post_id:
         cache.delete(f'post_{post_id}')  # Invalidate specific post cache
+        cache.delete(f'post_detail_{post_id}')
         cache.delete(f'post_{post_id}_comments')  # Invalidate post's comments cache
         # NEW: Invalidate category cache if we have one
         # For now, just invalidating all posts is enough.
 
+# Generation tokens need a finite timeout: SimpleCache prunes "never expires" (timeout=0) entries
+# first once it is over CACHE_THRESHOLD. A long one makes them the last entries to be evicted.
+GENERATION_TIMEOUT = 7 * 86400
+
+def cache_generation(name):
+    """
+    Returns the current generation token for a family of cached pages.
+    Pages embed it in their keys, so deleting `name` (see invalidate_post_caches) retires them all at once.
+    """
+    generation = cache.get(name)
+    if generation is None:
+        generation = str(time.time_ns())
+        cache.set(name, generation, timeout=GENERATION_TIMEOUT)
+    return generation
+
 # --- AWS S3 Configuration (for Vercel deployment) ---
 S3_BUCKET = os.getenv('S3_BUCKET_NAME')
 S3_ACCESS_KEY = os.getenv('AWS_ACCESS_KEY_ID')
@@ -60,6 +108,24 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True) # Create upload directory if it doesn'
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# --- Media Serving Configuration ---
+# '' serves files from this process (gunicorn turns the body into sendfile()),
+# 'nginx' hands them to a fronting nginx via X-Accel-Redirect, 'sendfile' uses X-Sendfile (Apache/lighttpd).
+MEDIA_ACCEL_MODE = os.getenv('MEDIA_ACCEL_MODE', '')
+MEDIA_ACCEL_PREFIX = os.getenv('MEDIA_ACCEL_PREFIX', '/protected-uploads/')  # nginx `internal` location for UPLOAD_FOLDER
+MEDIA_MAX_AGE = 3600  # Browser cache lifetime for uploads whose names aren't content-addressed
+MEDIA_IMMUTABLE_MAX_AGE = 31536000  # One year for content-addressed names, which never change
+_HASHED_UPLOAD_RE = re.compile(r'^([0-9a-f]{32})_')  # <sha256 prefix>_<name>
+_UUID_UPLOAD_RE = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_')  # Older uploads, also never rewritten
+
+def content_hash(file):
+    """Returns a SHA-256 prefix of an uploaded file's bytes and rewinds it for saving"""
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: file.stream.read(1 << 20), b''):
+        digest.update(chunk)
+    file.stream.seek(0)
+    return digest.hexdigest()[:32]
+
 # --- Custom JWT Error Handlers ---
 @jwt.unauthorized_loader
 def unauthorized_callback(callback):
@@ -79,12 +145,319 @@ DB_NAME = "blog"
 DB_USER = "p1"
 DB_PASS = "root"
 
-def get_db_connection():
-    conn = psycopg2.connect(
-        host=DB_HOST, database=DB_NAME,
-        user=DB_USER, password=DB_PASS
-    )
-    
+# Primary takes all writes; replicas (optional, ';'-separated DSNs) serve read-only routes
+DB_PRIMARY_DSN = os.getenv('DB_PRIMARY_DSN', f"host={DB_HOST} dbname={DB_NAME} user={DB_USER} password={DB_PASS}")
+DB_REPLICA_DSNS = [dsn.strip() for dsn in os.getenv('DB_REPLICA_DSNS', '').split(';') if dsn.strip()]
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '5'))  # Idle connections kept open per database
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '20'))  # Hard cap on connections per database
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '10'))  # Seconds to wait for a free connection
+REPLICA_MAX_LAG_SECONDS = float(os.getenv('REPLICA_MAX_LAG_SECONDS', '5'))  # Laggier replicas are skipped
+REPLICA_LAG_CHECK_SECONDS = 5  # How often each replica's lag is re-measured
+REPLICA_CONNECT_TIMEOUT = int(os.getenv('REPLICA_CONNECT_TIMEOUT', '2'))  # Seconds before an unreachable replica is given up on
+READ_YOUR_WRITES_SECONDS = int(os.getenv('READ_YOUR_WRITES_SECONDS', '10'))  # Primary pin after a user writes
+
+# --- SQL Accounting & Slow-Query Log ---
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))  # Statements slower than this are logged
+SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv('SLOW_QUERY_EXPLAIN_SAMPLE', '0.1'))  # Fraction of slow SELECTs re-run under EXPLAIN
+SLOW_QUERY_PLAN_FILE = os.getenv('SLOW_QUERY_PLAN_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'slow_query_plans.jsonl'))
+REPEATED_QUERY_WARN = int(os.getenv('REPEATED_QUERY_WARN', '10'))  # Same statement shape this often in one request smells like N+1
+
+slow_query_logger = logging.getLogger('chyrp.sql')
+_plan_file_lock = threading.Lock()
+_SQL_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_SQL_VALUES_LIST_RE = re.compile(r"(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+_SQL_WHITESPACE_RE = re.compile(r"\s+")
+
+def query_fingerprint(query):
+    """Returns (fingerprint, normalized_sql) with literals stripped so repeated statement shapes group together"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    normalized = _SQL_LITERAL_RE.sub('?', query)
+    normalized = _SQL_VALUES_LIST_RE.sub(r"\1, ...", normalized)  # execute_values batches of any size look alike
+    normalized = _SQL_WHITESPACE_RE.sub(' ', normalized).strip()
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:16], normalized
+
+def capture_query_plan(conn, query, params, fingerprint, duration_ms):
+    """Re-runs a slow SELECT (or EXECUTE of a prepared read) under EXPLAIN (ANALYZE, BUFFERS) and appends the plan to the local plan store"""
+    try:
+        # Plain cursor so the EXPLAIN itself is not accounted; the savepoint keeps a failed EXPLAIN
+        # from aborting the caller's transaction.
+        cur = conn.cursor(cursor_factory=psycopg2.extensions.cursor)
+        cur.execute("SAVEPOINT capture_query_plan")
+        try:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + query, params)
+            plan = cur.fetchone()[0]
+            cur.execute("RELEASE SAVEPOINT capture_query_plan")
+        except psycopg2.DatabaseError:
+            cur.execute("ROLLBACK TO SAVEPOINT capture_query_plan")
+            raise
+        finally:
+            cur.close()
+    except Exception as e:
+        slow_query_logger.warning("Could not capture plan for %s: %s", fingerprint, e)
+        return
+
+    record = {
+        'captured_at': datetime.now().isoformat(),
+        'fingerprint': fingerprint,
+        'duration_ms': round(duration_ms, 2),
+        'endpoint': request.endpoint if has_request_context() else None,
+        'query': query,
+        'params': repr(params),
+        'plan': plan,
+    }
+    with _plan_file_lock:
+        with open(SLOW_QUERY_PLAN_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+
+def account_query(conn, query, params, duration_ms, succeeded):
+    """Adds a statement to the per-request totals and logs it if it was slow"""
+    fingerprint = normalized = None
+    if has_request_context():
+        g.sql_queries = g.get('sql_queries', 0) + 1
+        g.sql_time_ms = g.get('sql_time_ms', 0.0) + duration_ms
+        fingerprint, normalized = query_fingerprint(query)
+        g.setdefault('sql_fingerprints', Counter())[fingerprint] += 1
+        if g.sql_fingerprints[fingerprint] == REPEATED_QUERY_WARN:
+            slow_query_logger.warning("Statement [%s] ran %d times in %s (possible N+1): %s",
+                                      fingerprint, REPEATED_QUERY_WARN, request.endpoint, normalized)
+
+    if duration_ms < SLOW_QUERY_MS:
+        return
+    if fingerprint is None:
+        fingerprint, normalized = query_fingerprint(query)
+    slow_query_logger.warning("Slow query %.1fms [%s] %s params=%r", duration_ms, fingerprint, normalized, params)
+    # Registered prepared statements are all reads, so EXECUTE is as safe to re-run as SELECT
+    if (succeeded and isinstance(query, str) and normalized.upper().startswith(('SELECT', 'EXECUTE'))
+            and random.random() < SLOW_QUERY_EXPLAIN_SAMPLE):
+        capture_query_plan(conn, query, params, fingerprint, duration_ms)
+
+class AccountingCursorMixin:
+    """Times every execute() and reports it to account_query"""
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        succeeded = False
+        try:
+            result = super().execute(query, vars)
+            succeeded = True
+            return result
+        finally:
+            account_query(self.connection, query, vars, (time.perf_counter() - started) * 1000, succeeded)
+
+class AccountingCursor(AccountingCursorMixin, psycopg2.extensions.cursor):
+    pass
+
+class AccountingDictCursor(AccountingCursorMixin, psycopg2.extras.DictCursor):
+    pass
+
+_ACCOUNTING_CURSORS = {
+    None: AccountingCursor,
+    psycopg2.extensions.cursor: AccountingCursor,
+    psycopg2.extras.DictCursor: AccountingDictCursor,
+}
+
+class AccountingConnection(psycopg2.extensions.connection):
+    """Connection whose default and DictCursor cursors are swapped for accounting ones"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()  # Names PREPAREd on this session (see execute_prepared)
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get('cursor_factory')
+        if factory is None or factory is psycopg2.extras.DictCursor:
+            kwargs['cursor_factory'] = _ACCOUNTING_CURSORS[factory]
+        return super().cursor(*args, **kwargs)
+
+@app.before_request
+def start_sql_accounting():
+    g.request_started = time.perf_counter()
+    g.sql_queries = 0
+    g.sql_time_ms = 0.0
+
+@app.after_request
+def add_server_timing(response):
+    """Exposes per-request DB totals in a Server-Timing header (visible in browser devtools)"""
+    if 'request_started' in g:
+        total_ms = (time.perf_counter() - g.request_started) * 1000
+        response.headers['Server-Timing'] = (
+            f'db;dur={g.sql_time_ms:.1f};desc="{g.sql_queries} queries", app;dur={total_ms:.1f}'
+        )
+        response.headers['Timing-Allow-Origin'] = 'http://localhost:5173'
+    return response
+
+class PooledConnection:
+    """Pooled connection handed to route code; close() returns it to its pool instead of closing it"""
+    def __init__(self, pool, slots, conn, dsn):
+        self._pool, self._slots, self._conn, self.dsn = pool, slots, conn, dsn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        try:
+            self._pool.putconn(conn)  # Rolls back any open transaction before reuse
+        finally:
+            self._slots.release()
+
+class SharedConnection:
+    """A /batch request's connection lent to one sub-request; close() just ends its transaction"""
+    def __init__(self, conn):
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        self._conn.rollback()  # Leaves a clean connection even if the sub-request's query failed
+
+_pools = {}  # dsn -> (pool, semaphore bounding checkouts)
+_pools_lock = threading.Lock()
+_pool_create_locks = {}  # dsn -> lock held while that pool opens its first connections
+_replica_lag = {}  # dsn -> (checked_at, lag_seconds or None when unreachable)
+_replica_cycle = itertools.count()
+_schema_bootstrapped = False
+
+def _get_pool(dsn):
+    """
+    Returns (pool, semaphore) for dsn, creating the pool on first use.
+    Creation opens DB_POOL_SIZE connections, so it happens under a per-DSN lock: an unreachable
+    replica only holds up callers of that replica, never checkouts from the primary.
+    """
+    with _pools_lock:
+        if dsn in _pools:
+            return _pools[dsn]
+        create_lock = _pool_create_locks.setdefault(dsn, threading.Lock())
+    with create_lock:
+        with _pools_lock:
+            if dsn in _pools:  # Built by another thread while we waited
+                return _pools[dsn]
+        session_options = {}
+        if PLAN_CACHE_MODE != 'auto':
+            session_options['options'] = f"-c plan_cache_mode={PLAN_CACHE_MODE}"
+        if dsn in DB_REPLICA_DSNS and 'connect_timeout' not in dsn:
+            session_options['connect_timeout'] = REPLICA_CONNECT_TIMEOUT
+        entry = (
+            psycopg2.pool.ThreadedConnectionPool(
+                DB_POOL_SIZE, DB_POOL_MAX, dsn, connection_factory=AccountingConnection, **session_options
+            ),
+            threading.BoundedSemaphore(DB_POOL_MAX),
+        )
+        with _pools_lock:
+            _pools[dsn] = entry
+        return entry
+
+def _checkout(dsn):
+    pool, slots = _get_pool(dsn)
+    # ThreadedConnectionPool raises instead of waiting when exhausted, so queue on a semaphore first
+    if not slots.acquire(timeout=DB_POOL_TIMEOUT):
+        raise psycopg2.pool.PoolError("Timed out waiting for a database connection")
+    try:
+        conn = pool.getconn()
+        if conn.closed:  # Server restarted or dropped us; replace the dead connection
+            pool.putconn(conn, close=True)
+            conn = pool.getconn()
+    except Exception:
+        slots.release()
+        raise
+    return PooledConnection(pool, slots, conn, dsn)
+
+# The pin travels with the client as a signed, short-lived cookie, so whichever worker process
+# serves the next read honours it. Cross-origin clients must send requests with credentials.
+PRIMARY_PIN_COOKIE = 'primary_pin'
+_primary_pin_signer = URLSafeTimedSerializer(app.config["JWT_SECRET_KEY"], salt='primary-pin')
+
+def pin_to_primary(response, user_id):
+    """Sends this user's reads to the primary for a short window so they see their own writes"""
+    response.set_cookie(PRIMARY_PIN_COOKIE, _primary_pin_signer.dumps(str(user_id)),
+                        max_age=READ_YOUR_WRITES_SECONDS, httponly=True, samesite='Lax')
+
+def is_pinned_to_primary():
+    """True when the current user wrote recently; their reads then skip replicas and shared caches"""
+    if not has_request_context():
+        return False
+    if 'pinned_to_primary' not in g:
+        g.pinned_to_primary = _check_primary_pin()
+    return g.pinned_to_primary
+
+def _check_primary_pin():
+    token = request.cookies.get(PRIMARY_PIN_COOKIE)
+    if not token:
+        return False
+    try:
+        pinned_user_id = _primary_pin_signer.loads(token, max_age=READ_YOUR_WRITES_SECONDS)
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+    except Exception: # nosec
+        return False
+    return bool(user_id) and str(user_id) == pinned_user_id
+
+def _measure_replica_lag(conn):
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT CASE
+            WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM NOW() - pg_last_xact_replay_timestamp()), 0)
+        END
+    """)
+    lag = float(cur.fetchone()[0])
+    conn.rollback()
+    return lag
+
+def _replica_connection():
+    """Round-robins over replicas, skipping unreachable or lagging ones; None means use the primary"""
+    start = next(_replica_cycle)
+    for offset in range(len(DB_REPLICA_DSNS)):
+        dsn = DB_REPLICA_DSNS[(start + offset) % len(DB_REPLICA_DSNS)]
+        checked_at, lag = _replica_lag.get(dsn, (0, 0))
+        stale = time.monotonic() - checked_at > REPLICA_LAG_CHECK_SECONDS
+        if not stale and (lag is None or lag > REPLICA_MAX_LAG_SECONDS):
+            continue
+        try:
+            conn = _checkout(dsn)
+        except Exception as e:
+            print(f"Replica unavailable, skipping for {REPLICA_LAG_CHECK_SECONDS}s: {e}")
+            _replica_lag[dsn] = (time.monotonic(), None)
+            continue
+        if stale:
+            try:
+                lag = _measure_replica_lag(conn)
+            except Exception as e:
+                print(f"Could not measure replica lag: {e}")
+                lag = None
+            _replica_lag[dsn] = (time.monotonic(), lag)
+            if lag is None or lag > REPLICA_MAX_LAG_SECONDS:
+                conn.close()
+                continue
+        return conn
+    return None
+
+def get_db_connection(readonly=False):
+    """
+    Checks out a pooled connection; call close() to hand it back.
+    readonly=True routes to a healthy replica unless the current user recently wrote.
+    Inside a /batch request, read-only sub-requests all share the batch's one connection.
+    """
+    if readonly and has_request_context() and 'batch_connection' in g:
+        if g.batch_connection is None:
+            g.batch_connection = _open_connection(readonly=True)
+        return SharedConnection(g.batch_connection)
+    return _open_connection(readonly)
+
+def _open_connection(readonly):
+    global _schema_bootstrapped
+    if readonly and DB_REPLICA_DSNS and not is_pinned_to_primary():
+        conn = _replica_connection()
+        if conn is not None:
+            return conn
+
+    conn = _checkout(DB_PRIMARY_DSN)
+    if _schema_bootstrapped:
+        return conn
+
     # Create tables if they don't exist
     with conn.cursor() as cur:
         # Create posts table with quote and link support
@@ -119,11 +492,27 @@ def get_db_connection():
                 END IF;
             END $$;
         """)
+
+        # Pre-rendered body and excerpt (see render_content); `flask render-posts` fills in old posts
+        cur.execute("ALTER TABLE posts ADD COLUMN IF NOT EXISTS content_html TEXT")
+        cur.execute("ALTER TABLE posts ADD COLUMN IF NOT EXISTS excerpt TEXT")
         
         conn.commit()
-    
+    _schema_bootstrapped = True
     return conn
 
+@app.after_request
+def pin_writers_to_primary(response):
+    if (request.method in ('POST', 'PUT', 'DELETE') and response.status_code < 400
+            and request.endpoint != 'batch_requests'):  # /batch is a POST but only reads
+        try:
+            user_id = get_jwt_identity()
+        except Exception: # nosec
+            user_id = None
+        if user_id:
+            pin_to_primary(response, user_id)
+    return response
+
 # --- Helper: Manage Tags ---
 def manage_tags(cur, post_id, tags_string):
     if tags_string:
@@ -143,6 +532,380 @@ def manage_tags(cur, post_id, tags_string):
                 (post_id, tag_id)
             )
 
+# --- Prepared Statements ---
+# The hot feed/detail queries are PREPAREd once per pooled connection and then run by name with
+# EXECUTE, so Postgres skips parsing and analysis on every request (and planning too, once it settles
+# on a generic plan). PLAN_CACHE_MODE picks how those plans are chosen (PostgreSQL 12+):
+# 'auto' lets the server decide, 'force_generic_plan' plans once per connection, 'force_custom_plan'
+# re-plans for every parameter set. Set USE_PREPARED_STATEMENTS=0 behind a transaction-pooling
+# bouncer, where server-side statements don't survive between transactions.
+USE_PREPARED_STATEMENTS = os.getenv('USE_PREPARED_STATEMENTS', '1') == '1'
+PLAN_CACHE_MODE = os.getenv('PLAN_CACHE_MODE', 'auto')
+
+_FEED_PAGE_SQL = """
+    SELECT 
+        p.*, 
+        u.username,
+        cat.name as category_name, cat.slug as category_slug,
+        COALESCE(lc.like_count, 0) AS like_count,
+        ARRAY_AGG(DISTINCT t.name) FILTER (WHERE t.name IS NOT NULL) as tags,
+        ARRAY_AGG(DISTINCT pm.media_url) FILTER (WHERE pm.media_url IS NOT NULL) as media_urls
+    FROM posts p
+    JOIN users u ON p.user_id = u.id
+    LEFT JOIN (
+        SELECT post_id, COUNT(*) as like_count
+        FROM post_likes
+        GROUP BY post_id
+    ) lc ON p.id = lc.post_id
+    LEFT JOIN post_tags pt ON p.id = pt.post_id
+    LEFT JOIN tags t ON pt.tag_id = t.id
+    LEFT JOIN post_media pm ON p.id = pm.post_id
+    LEFT JOIN categories cat ON p.category_id = cat.id
+    {where_sql}
+    GROUP BY p.id, u.username, lc.like_count, cat.name, cat.slug
+    ORDER BY p.created_at DESC
+    LIMIT {limit} OFFSET {offset}
+"""
+# This subquery finds all post_ids that have a matching tag
+_FEED_TAG_FILTER = "WHERE p.id IN (SELECT pt.post_id FROM post_tags pt JOIN tags t ON pt.tag_id = t.id WHERE t.name ILIKE $1)"
+
+# name -> (parameter types, SQL using $1..$n). Only read-only statements belong here.
+PREPARED_STATEMENTS = {
+    'feed_count': ([], "SELECT COUNT(DISTINCT p.id) FROM posts p"),
+    'feed_count_by_tag': (['text'], f"SELECT COUNT(DISTINCT p.id) FROM posts p {_FEED_TAG_FILTER}"),
+    'feed_page': (['integer', 'integer'], _FEED_PAGE_SQL.format(where_sql='', limit='$1', offset='$2')),
+    'feed_page_by_tag': (['text', 'integer', 'integer'],
+                         _FEED_PAGE_SQL.format(where_sql=_FEED_TAG_FILTER, limit='$2', offset='$3')),
+    'post_detail': (['integer'], """
+        SELECT 
+            p.*, 
+            u.username,
+            cat.name as category_name, cat.slug as category_slug,
+            COALESCE(lc.like_count, 0) AS like_count
+        FROM posts p 
+        JOIN users u ON p.user_id = u.id
+        LEFT JOIN (
+            SELECT post_id, COUNT(*) as like_count
+            FROM post_likes
+            GROUP BY post_id
+        ) lc ON p.id = lc.post_id
+        LEFT JOIN categories cat ON p.category_id = cat.id
+        WHERE p.id = $1
+    """),
+    'post_tags': (['integer'], """
+        SELECT t.name FROM tags t
+        JOIN post_tags pt ON t.id = pt.tag_id
+        WHERE pt.post_id = $1
+    """),
+    'post_media': (['integer'], "SELECT media_url FROM post_media WHERE post_id = $1 ORDER BY id ASC"),
+    'tag_posts': (['text'], """
+        SELECT 
+            p.*, u.username,
+            COALESCE(lc.like_count, 0) AS like_count,
+            ARRAY_AGG(t.name) FILTER (WHERE t.name IS NOT NULL) as tags
+        FROM posts p
+        JOIN users u ON p.user_id = u.id
+        LEFT JOIN (SELECT post_id, COUNT(*) as like_count FROM post_likes GROUP BY post_id) lc 
+            ON p.id = lc.post_id
+        JOIN post_tags pt ON p.id = pt.post_id
+        JOIN tags t ON pt.tag_id = t.id
+        WHERE t.name = $1
+        GROUP BY p.id, u.username, lc.like_count
+        ORDER BY p.created_at DESC
+    """),
+    'category_by_slug': (['text'], "SELECT name FROM categories WHERE slug = $1"),
+    'category_posts': (['text'], """
+        SELECT 
+            p.*, u.username, cat.name as category_name, cat.slug as category_slug,
+            COALESCE(lc.like_count, 0) AS like_count,
+            ARRAY_AGG(DISTINCT t.name) FILTER (WHERE t.name IS NOT NULL) as tags,
+            ARRAY_AGG(DISTINCT pm.media_url) FILTER (WHERE pm.media_url IS NOT NULL) as media_urls
+        FROM posts p
+        JOIN users u ON p.user_id = u.id
+        JOIN categories cat ON p.category_id = cat.id
+        LEFT JOIN (SELECT post_id, COUNT(*) as like_count FROM post_likes GROUP BY post_id) lc ON p.id = lc.post_id
+        LEFT JOIN post_tags pt ON p.id = pt.post_id
+        LEFT JOIN tags t ON pt.tag_id = t.id
+        LEFT JOIN post_media pm ON p.id = pm.post_id
+        WHERE cat.slug = $1
+        GROUP BY p.id, u.username, lc.like_count, cat.name, cat.slug
+        ORDER BY p.created_at DESC
+    """),
+}
+_POSITIONAL_PARAM_RE = re.compile(r'\$(\d+)')
+
+def as_text_query(name):
+    """The registered statement rewritten for a plain execute(): $n becomes %(pn)s and literal % is escaped"""
+    return _POSITIONAL_PARAM_RE.sub(r'%(p\1)s', PREPARED_STATEMENTS[name][1].replace('%', '%%'))
+
+def execute_prepared(cur, name, params=()):
+    """Runs a registered statement by name, PREPAREing it first if this connection hasn't seen it yet"""
+    if not USE_PREPARED_STATEMENTS:
+        cur.execute(as_text_query(name), {f'p{i}': value for i, value in enumerate(params, 1)})
+        return
+    prepared = cur.connection.prepared_statements
+    if name not in prepared:
+        _prepare(cur, name)
+    try:
+        _execute(cur, name, params)
+    except psycopg2.errors.FeatureNotSupported:
+        # "cached plan must not change result type": a table behind p.* gained a column after this
+        # session PREPAREd the statement. The registry is read-only, so the rollback loses no work.
+        cur.connection.rollback()
+        cur.execute(f"DEALLOCATE {name}")
+        prepared.discard(name)
+        _prepare(cur, name)
+        _execute(cur, name, params)
+
+def _prepare(cur, name):
+    param_types, sql = PREPARED_STATEMENTS[name]
+    signature = f" ({', '.join(param_types)})" if param_types else ""
+    cur.execute(f"PREPARE {name}{signature} AS {sql}")
+    cur.connection.prepared_statements.add(name)  # PREPARE isn't transactional, so a later rollback doesn't undo it
+
+def _execute(cur, name, params):
+    if params:
+        cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", tuple(params))
+    else:
+        cur.execute(f"EXECUTE {name}")
+
+# --- Helper: Render Post Content ---
+# Markdown is rendered and sanitized once, when a post is written, into posts.content_html, along
+# with a plain-text excerpt for feed cards. Crawlers and feed readers get real HTML, and feeds can
+# send the excerpt instead of the full body (?excerpt=1).
+EXCERPT_LENGTH = 280  # Characters, cut back to a word boundary
+RENDER_BATCH_SIZE = 500
+_MARKDOWN_EXTENSIONS = ['extra', 'sane_lists']  # Tables, fenced code, footnotes; like remark-gfm on the client
+_HTML_ATTRIBUTES = dict(nh3.ALLOWED_ATTRIBUTES, code={'class'}, a={'href', 'hreflang', 'title'},
+                        img={'src', 'alt', 'title', 'width', 'height'}, th={'align'}, td={'align'})
+_BLOCK_TAG_RE = re.compile(r'</?(?:p|div|br|hr|h[1-6]|li|ul|ol|pre|blockquote|table|tr|td|th)\b[^>]*>')
+_TAG_RE = re.compile(r'<[^>]+>')
+
+def _keep_language_class(tag, attribute, value):
+    """Only fenced-code language classes (used for syntax highlighting) survive sanitizing"""
+    if attribute == 'class':
+        classes = [name for name in value.split() if name.startswith('language-')]
+        return ' '.join(classes) or None
+    return value
+
+def render_content(content):
+    """Returns (content_html, excerpt) for a post body written in markdown"""
+    if not content:
+        return None, None
+    content_html = nh3.clean(
+        markdown.markdown(content, extensions=_MARKDOWN_EXTENSIONS, output_format='html'),
+        attributes=_HTML_ATTRIBUTES, attribute_filter=_keep_language_class,
+    )
+    text = ' '.join(html.unescape(_TAG_RE.sub('', _BLOCK_TAG_RE.sub(' ', content_html))).split())
+    if len(text) > EXCERPT_LENGTH:
+        text = text[:EXCERPT_LENGTH].rsplit(' ', 1)[0].rstrip('.,;:!?') + '…'
+    return content_html, text
+
+@app.cli.command('render-posts')
+@click.option('--all', 'render_all', is_flag=True, help="Re-render every post, not only those without content_html.")
+@click.option('--workers', default=os.cpu_count() or 1, show_default=True, help="Rendering processes.")
+def render_posts_command(render_all, workers):
+    """Backfills content_html and excerpts for existing posts, rendering in parallel processes."""
+    rendered, last_id = 0, 0
+    conn = get_db_connection()
+    try:
+        cur = conn.cursor()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            while True:
+                # Keyset batches: each one is a short transaction, and the scan resumes where the last one ended
+                cur.execute("""
+                    SELECT id, content FROM posts
+                    WHERE id > %s AND (%s OR content_html IS NULL) AND COALESCE(content, '') <> ''
+                    ORDER BY id
+                    LIMIT %s
+                """, (last_id, render_all, RENDER_BATCH_SIZE))
+                rows = cur.fetchall()
+                if not rows:
+                    break
+                results = executor.map(render_content, [row[1] for row in rows], chunksize=25)
+                cur.execute("SET LOCAL chyrp.skip_touch = 'on'")  # A re-render isn't an edit; keep updated_at
+                psycopg2.extras.execute_values(cur, """
+                    UPDATE posts p SET content_html = v.content_html, excerpt = v.excerpt
+                    FROM (VALUES %s) AS v(id, content_html, excerpt)
+                    WHERE p.id = v.id
+                """, [(row[0], *result) for row, result in zip(rows, results)], page_size=RENDER_BATCH_SIZE)
+                conn.commit()
+                rendered += len(rows)
+                last_id = rows[-1][0]
+                print(f"Rendered {rendered} posts (up to id {last_id})")
+    finally:
+        conn.close()
+    invalidate_post_caches()
+    cache.delete('feeds')  # Every cached feed embeds the old HTML
+    print(f"Done: {rendered} posts rendered")
+
+# --- Helper: Liked-Set Cache ---
+# Each user's liked post IDs are kept in the cache as a sorted uint32 array (4 bytes per like),
+# loaded lazily from post_likes and patched in place by toggle_like. Feed pages are therefore
+# cached once for everybody and liked_by_user is filled in per request with a binary search,
+# instead of running an EXISTS subquery per row for every user.
+# The cache is per process and only the worker that served a like patches its copy,
+# so this is also how long other workers may show a stale liked_by_user (same as a feed page).
+LIKED_SET_TIMEOUT = 300
+
+def get_liked_set(user_id, conn=None):
+    """
+    Returns the sorted array('I') of post IDs the user has liked.
+    Pass the connection the route already holds so a cache miss doesn't check out a second one.
+    """
+    liked = array('I')
+    # Another worker may hold a stale copy of a set this user just changed
+    data = None if is_pinned_to_primary() else cache.get(f'liked_set_{user_id}')
+    if data is None:
+        own_conn = None
+        try:
+            if conn is None:
+                conn = own_conn = get_db_connection(readonly=True)
+            cur = conn.cursor()
+            # Index-only scan of the (user_id, post_id) primary key, already in order
+            cur.execute("SELECT post_id FROM post_likes WHERE user_id = %s ORDER BY post_id", (user_id,))
+            liked.extend(row[0] for row in cur.fetchall())
+        finally:
+            if own_conn: own_conn.close()
+        cache.set(f'liked_set_{user_id}', liked.tobytes(), timeout=LIKED_SET_TIMEOUT)
+    else:
+        liked.frombytes(data)
+    return liked
+
+def update_liked_set(user_id, post_id, liked):
+    """Applies a like/unlike to the cached set; a set that isn't cached is simply loaded fresh next time"""
+    data = cache.get(f'liked_set_{user_id}')
+    if data is None:
+        return
+    ids = array('I')
+    ids.frombytes(data)
+    index = bisect.bisect_left(ids, post_id)
+    present = index < len(ids) and ids[index] == post_id
+    if liked and not present:
+        ids.insert(index, post_id)
+    elif not liked and present:
+        del ids[index]
+    cache.set(f'liked_set_{user_id}', ids.tobytes(), timeout=LIKED_SET_TIMEOUT)
+
+def fill_liked_by_user(posts, user_id, conn=None, omit=()):
+    """Copies shared (user-independent) post dicts, minus the omit keys, and sets liked_by_user for the given user"""
+    liked = get_liked_set(user_id, conn) if user_id else array('I')
+    filled = []
+    for post in posts:
+        post = {key: value for key, value in post.items() if key not in omit}
+        index = bisect.bisect_left(liked, post['id'])
+        post['liked_by_user'] = index < len(liked) and liked[index] == post['id']
+        filled.append(post)
+    return filled
+
+def feed_posts(posts, user_id, conn=None):
+    """
+    fill_liked_by_user for a list of posts. Lists never carry content_html (post detail and the Atom
+    feeds do), and ?excerpt=1 drops the markdown content as well.
+    """
+    omit = ('content', 'content_html') if request.args.get('excerpt', 0, type=int) else ('content_html',)
+    return fill_liked_by_user(posts, user_id, conn, omit)
+
+# --- Background Jobs ---
+RUN_BACKGROUND_JOBS = os.getenv('RUN_BACKGROUND_JOBS', '1') == '1'
+PERIODIC_JOBS = []  # (name, interval_seconds, func)
+_jobs_started = False
+_jobs_lock = threading.Lock()
+
+def periodic_job(name, interval_seconds):
+    """Registers a function to run every interval_seconds in a daemon thread (0 disables it)"""
+    def decorator(func):
+        if interval_seconds > 0:
+            PERIODIC_JOBS.append((name, interval_seconds, func))
+        return func
+    return decorator
+
+def _run_periodically(name, interval_seconds, func):
+    while True:
+        time.sleep(interval_seconds)
+        try:
+            with app.app_context():
+                func()
+        except Exception as e:
+            print(f"Background job {name} failed: {e}")
+
+@app.before_request
+def start_background_jobs():
+    """Starts the periodic jobs once per process, on the first request it serves"""
+    global _jobs_started
+    if _jobs_started or not RUN_BACKGROUND_JOBS:
+        return
+    with _jobs_lock:
+        if _jobs_started:
+            return
+        for name, interval_seconds, func in PERIODIC_JOBS:
+            threading.Thread(target=_run_periodically, args=(name, interval_seconds, func),
+                             name=f"job-{name}", daemon=True).start()
+        _jobs_started = True
+
+# --- Helper: View Events ---
+# Views are appended to the time-partitioned post_view_events table (see View Analytics below).
+# They are buffered per process and written in batches, so a page view costs no extra round trip.
+# Repeat views by the same viewer (user, or IP when anonymous) within VIEW_DEDUPE_SECONDS are ignored.
+# Recent viewers are tracked in a bounded in-process map rather than the app cache, so they can't
+# crowd the cache into pruning the entries that matter (page caches, generation tokens).
+VIEW_FLUSH_SECONDS = int(os.getenv('VIEW_FLUSH_SECONDS', '5'))
+VIEW_FLUSH_BATCH = 500  # Flush inline once this many views are waiting
+VIEW_DEDUPE_SECONDS = int(os.getenv('VIEW_DEDUPE_SECONDS', '1800'))
+VIEW_DEDUPE_MAX = int(os.getenv('VIEW_DEDUPE_MAX', '100000'))  # Oldest viewers are forgotten first
+_view_buffer = []
+_view_buffer_lock = threading.Lock()
+_recent_viewers = OrderedDict()  # (post_id, user id or IP) -> monotonic expiry, oldest first
+
+def view_flush_due():
+    """True when buffered views should be written inline instead of waiting for the background job"""
+    pending = len(_view_buffer)
+    return pending >= VIEW_FLUSH_BATCH or (pending > 0 and (not RUN_BACKGROUND_JOBS or VIEW_FLUSH_SECONDS <= 0))
+
+def record_view(post_id, user_id):
+    """
+    Queues one view event; user_id is None for anonymous visitors.
+    Returns True when the caller should call flush_view_events() once it has released its connection.
+    """
+    viewer = (post_id, user_id or request.remote_addr)
+    now = time.monotonic()
+    with _view_buffer_lock:
+        # Every entry has the same lifetime, so expired ones are always at the front
+        while _recent_viewers and next(iter(_recent_viewers.values())) <= now:
+            _recent_viewers.popitem(last=False)
+        if viewer in _recent_viewers:
+            return False
+        _recent_viewers[viewer] = now + VIEW_DEDUPE_SECONDS
+        if len(_recent_viewers) > VIEW_DEDUPE_MAX:
+            _recent_viewers.popitem(last=False)
+        _view_buffer.append((post_id, user_id, datetime.now(timezone.utc)))
+    return view_flush_due()
+
+@periodic_job('flush_view_events', VIEW_FLUSH_SECONDS)
+def flush_view_events():
+    """Writes the buffered view events in one statement. Returns how many were written."""
+    global _view_buffer
+    with _view_buffer_lock:
+        events, _view_buffer = _view_buffer, []
+    if not events:
+        return 0
+    conn = None
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        psycopg2.extras.execute_values(
+            cur, "INSERT INTO post_view_events (post_id, user_id, viewed_at) VALUES %s", events, page_size=1000
+        )
+        conn.commit()
+        return len(events)
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"DB Error writing {len(events)} view events: {error}")
+        return 0
+    finally:
+        if conn: conn.close()
+
+atexit.register(flush_view_events)  # Don't lose the last few seconds of views on a clean shutdown
+
 # =========================
 # === User Auth Routes ===
 # =========================
@@ -211,84 +974,137 @@ def get_posts():
     except Exception: # nosec
         user_id = None
     
+    # --- Pagination and Search Query Params ---
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 5, type=int) # Number of posts per page
+    tag_query = request.args.get('tag', None, type=str)
+    offset = (page - 1) * per_page
+
+    # The page itself is the same for every user, so it is cached once and liked_by_user filled in after
+    cache_key = f"feed_{cache_generation('all_posts')}_{tag_query or '*'}_{page}_{per_page}"
+    payload = None if is_pinned_to_primary() else cache.get(cache_key)  # A recent writer reads the primary
+    if payload is not None:
+        return jsonify(dict(payload, posts=feed_posts(payload['posts'], user_id), page=page))
+
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
-        # --- Pagination and Search Query Params ---
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 5, type=int) # Number of posts per page
-        tag_query = request.args.get('tag', None, type=str)
-        offset = (page - 1) * per_page
-
-        # --- Build Query Conditions ---
-        where_clauses = []
-        query_params = []
-
-        if tag_query:
-            # This subquery finds all post_ids that have a matching tag
-            where_clauses.append("p.id IN (SELECT pt.post_id FROM post_tags pt JOIN tags t ON pt.tag_id = t.id WHERE t.name ILIKE %s)")
-            query_params.append(f"%{tag_query}%")
-
-        where_sql = ("WHERE " + " AND ".join(where_clauses)) if where_clauses else ""
-
         # --- Total Count Query ---
-        count_query = f"SELECT COUNT(DISTINCT p.id) FROM posts p {where_sql}"
-        cur.execute(count_query, tuple(query_params))
+        if tag_query:
+            execute_prepared(cur, 'feed_count_by_tag', (f"%{tag_query}%",))
+        else:
+            execute_prepared(cur, 'feed_count')
         total_posts = cur.fetchone()[0]
         has_more = (offset + per_page) < total_posts
 
         # --- Main Posts Query ---
-        final_params = [user_id] + query_params + [per_page, offset]
-
-        sql_query = f"""
-            SELECT 
-                p.*, 
-                u.username,
-                cat.name as category_name, cat.slug as category_slug,
-                COALESCE(lc.like_count, 0) AS like_count,
-                EXISTS(SELECT 1 FROM post_likes WHERE post_id = p.id AND user_id = %s) AS liked_by_user,
-                ARRAY_AGG(DISTINCT t.name) FILTER (WHERE t.name IS NOT NULL) as tags,
-                ARRAY_AGG(DISTINCT pm.media_url) FILTER (WHERE pm.media_url IS NOT NULL) as media_urls
-            FROM posts p
-            JOIN users u ON p.user_id = u.id
-            LEFT JOIN (
-                SELECT post_id, COUNT(*) as like_count
-                FROM post_likes
-                GROUP BY post_id
-            ) lc ON p.id = lc.post_id
-            LEFT JOIN post_tags pt ON p.id = pt.post_id
-            LEFT JOIN tags t ON pt.tag_id = t.id
-            LEFT JOIN post_media pm ON p.id = pm.post_id
-            LEFT JOIN categories cat ON p.category_id = cat.id
-            {where_sql}
-            GROUP BY p.id, u.username, lc.like_count, cat.name, cat.slug
-            ORDER BY p.created_at DESC
-            LIMIT %s OFFSET %s;
-        """
-        
-        cur.execute(sql_query, tuple(final_params))
+        if tag_query:
+            execute_prepared(cur, 'feed_page_by_tag', (f"%{tag_query}%", per_page, offset))
+        else:
+            execute_prepared(cur, 'feed_page', (per_page, offset))
         posts = [dict(post) for post in cur.fetchall()]
         cur.close()
-        
-        return jsonify({
+
+        payload = {
             "posts": posts,
             "has_more": has_more,
-            "page": page,
             "total_posts": total_posts
-        })
+        }
+        cache.set(cache_key, payload, timeout=300)
+        return jsonify(dict(payload, posts=feed_posts(posts, user_id, conn), page=page))
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"DATABASE ERROR fetching posts: {error}")
         return jsonify({'message': 'Failed to retrieve posts.'}), 500
     finally:
         if conn: conn.close()
 
+# --- Batch Post Endpoint ---
+MAX_BATCH_IDS = 100
+
+@app.route('/posts/batch', methods=['GET'])
+def get_posts_batch():
+    """
+    Fetches many posts (with tags, media and like/comment/webmention counts) in one call: /posts/batch?ids=1,2,3
+    Each post is cached under post_<id>; only the misses hit the database, in three queries total.
+    """
+    user_id = None
+    try:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+    except Exception: # nosec
+        user_id = None
+
+    try:
+        ids = [int(part) for part in request.args.get('ids', '').split(',') if part.strip()]
+    except ValueError:
+        return jsonify({"message": "ids must be a comma-separated list of integers"}), 400
+    ids = list(dict.fromkeys(ids))  # De-duplicate, keep order
+    if not ids:
+        return jsonify({"message": "No post ids given"}), 400
+    if len(ids) > MAX_BATCH_IDS:
+        return jsonify({"message": f"At most {MAX_BATCH_IDS} ids per request"}), 400
+
+    posts_by_id = {
+        post_id: post
+        for post_id, post in zip(ids, cache.get_many(*[f'post_{post_id}' for post_id in ids]))
+        if post is not None
+    }
+    missing_ids = [post_id for post_id in ids if post_id not in posts_by_id]
+
+    conn = None
+    try:
+        if missing_ids:
+            conn = get_db_connection(readonly=True)
+            cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            cur.execute("""
+                SELECT
+                    p.*,
+                    u.username,
+                    cat.name as category_name, cat.slug as category_slug,
+                    (SELECT COUNT(*) FROM post_likes WHERE post_id = p.id) AS like_count,
+                    (SELECT COUNT(*) FROM comments WHERE post_id = p.id) AS comment_count,
+                    (SELECT COUNT(*) FROM webmentions WHERE post_id = p.id AND verified = true) AS webmention_count
+                FROM posts p
+                JOIN users u ON p.user_id = u.id
+                LEFT JOIN categories cat ON p.category_id = cat.id
+                WHERE p.id = ANY(%s)
+            """, (missing_ids,))
+            loaded = {row['id']: dict(row, tags=[], media_urls=[]) for row in cur.fetchall()}
+
+            if loaded:
+                cur.execute("""
+                    SELECT pt.post_id, t.name FROM post_tags pt
+                    JOIN tags t ON pt.tag_id = t.id
+                    WHERE pt.post_id = ANY(%s)
+                """, (list(loaded),))
+                for row in cur.fetchall():
+                    loaded[row['post_id']]['tags'].append(row['name'])
+
+                cur.execute("SELECT post_id, media_url FROM post_media WHERE post_id = ANY(%s) ORDER BY id ASC",
+                            (list(loaded),))
+                for row in cur.fetchall():
+                    loaded[row['post_id']]['media_urls'].append(row['media_url'])
+
+                cache.set_many({f'post_{post_id}': post for post_id, post in loaded.items()}, timeout=300)
+            posts_by_id.update(loaded)
+
+        posts = feed_posts([posts_by_id[post_id] for post_id in ids if post_id in posts_by_id], user_id, conn)
+        return jsonify({
+            "posts": posts,
+            "missing": [post_id for post_id in ids if post_id not in posts_by_id]
+        })
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"DATABASE ERROR fetching post batch: {error}")
+        return jsonify({'message': 'Failed to retrieve posts.'}), 500
+    finally:
+        if conn: conn.close()
+
 # --- Single Post Detail Endpoint (with View Count Logic) ---
 @app.route('/posts/<int:post_id>', methods=['GET'])
-@cache.memoize(timeout=300)  # Use memoize instead of cached to include parameters in cache key
 def get_post(post_id):
-    """Fetches a single post by its ID and increments the view count."""
+    """Fetches a single post by its ID and records a view event."""
     print(f"Fetching post with ID: {post_id}")  # Debug log
     user_id = None
     try:
@@ -301,74 +1117,44 @@ def get_post(post_id):
         print(f"Token verification exception (non-critical): {e}")
         user_id = None
 
+    # The post itself is the same for every viewer; liked_by_user is filled in per request
+    cache_key = f'post_detail_{post_id}'
     conn = None
+    flush_views = False
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        post_data = None if is_pinned_to_primary() else cache.get(cache_key)
+        if post_data is None:
+            conn = get_db_connection(readonly=True)
+            cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
-        print(f"Executing query for post {post_id} with user_id {user_id}")  # Debug log
-        # Get the post and its author with like count in a single query
-        query = """
-            SELECT 
-                p.*, 
-                u.username,
-                cat.name as category_name, cat.slug as category_slug,
-                COALESCE(lc.like_count, 0) AS like_count,
-                CASE WHEN %s IS NOT NULL THEN 
-                    EXISTS(SELECT 1 FROM post_likes WHERE post_id = p.id AND user_id = %s) 
-                ELSE false END AS liked_by_user
-            FROM posts p 
-            JOIN users u ON p.user_id = u.id
-            LEFT JOIN (
-                SELECT post_id, COUNT(*) as like_count
-                FROM post_likes
-                GROUP BY post_id
-            ) lc ON p.id = lc.post_id
-            LEFT JOIN categories cat ON p.category_id = cat.id
-            WHERE p.id = %s
-        """
-        
-        cur.execute(query, (user_id, user_id, post_id))
-        post = cur.fetchone()
+            print(f"Executing query for post {post_id}")  # Debug log
+            # Get the post and its author with like count in a single query
+            execute_prepared(cur, 'post_detail', (post_id,))
+            post = cur.fetchone()
 
-        if not post:
-            print(f"Post {post_id} not found")  # Debug log
-            return jsonify({"message": "Post not found"}), 404
+            if not post:
+                print(f"Post {post_id} not found")  # Debug log
+                return jsonify({"message": "Post not found"}), 404
 
-        # --- View Count Logic ---
-        increment_view = False
-        if user_id and post['user_id'] != user_id:
-            cur.execute("SELECT 1 FROM post_views WHERE post_id = %s AND user_id = %s", (post_id, user_id))
-            existing_view = cur.fetchone()
-            if not existing_view:
-                increment_view = True
-
-        if increment_view:
-            cur.execute("UPDATE posts SET view_count = view_count + 1 WHERE id = %s", (post_id,))
-            cur.execute("INSERT INTO post_views (post_id, user_id) VALUES (%s, %s)", (post_id, user_id))
-            conn.commit()
-            # Update the post data to reflect the new view count
-            post = dict(post)  # Convert to dict for modification
-            post['view_count'] += 1
+            # Get all tags for the post
+            execute_prepared(cur, 'post_tags', (post_id,))
+            tags = [row['name'] for row in cur.fetchall()]
 
-        # Get all tags for the post
-        cur.execute("""
-            SELECT t.name FROM tags t
-            JOIN post_tags pt ON t.id = pt.tag_id
-            WHERE pt.post_id = %s
-        """, (post_id,))
-        tags = [row['name'] for row in cur.fetchall()]
+            # Get all media URLs for the post
+            execute_prepared(cur, 'post_media', (post_id,))
+            media_urls = [row['media_url'] for row in cur.fetchall()]
 
-        # Get all media URLs for the post
-        cur.execute("SELECT media_url FROM post_media WHERE post_id = %s ORDER BY id ASC", (post_id,))
-        media_urls = [row['media_url'] for row in cur.fetchall()]
+            post_data = dict(post)
+            post_data['tags'] = tags
+            post_data['media_urls'] = media_urls
+            cache.set(cache_key, post_data, timeout=300)
 
-        # Prepare the final response
-        post_data = dict(post)
-        post_data['tags'] = tags
-        post_data['media_urls'] = media_urls
+        # --- View Count Logic ---
+        # Every view (signed in or not) becomes an event; view_count catches up when events are rolled up
+        if post_data['user_id'] != user_id:
+            flush_views = record_view(post_id, user_id)
 
-        return jsonify(post_data)
+        return jsonify(fill_liked_by_user([post_data], user_id, conn)[0])
 
     except (Exception, psycopg2.DatabaseError) as error:
         print(f"ERROR in get_post: {error}")
@@ -382,10 +1168,12 @@ def get_post(post_id):
                 conn.close()
             except Exception as e:
                 print(f"Error closing connection: {e}")  # Log connection closing errors
+        # Only once our connection is back in the pool; a /batch flushes after releasing its own
+        if flush_views and 'batch_connection' not in g:
+            flush_view_events()
 @app.route('/posts', methods=['POST'])
 @jwt_required()
 def create_post():
-    invalidate_post_caches()  # Invalidate relevant caches
     user_id = int(get_jwt_identity())
     data = request.get_json()
     
@@ -415,9 +1203,11 @@ def create_post():
         # Use the first media URL as the primary 'image_url' for thumbnails/previews
         primary_media_url = media_urls[0] if media_urls else None
 
+        content_html, excerpt = render_content(content)
+
         cur.execute(
-            "INSERT INTO posts (user_id, type, title, content, attribution, license, image_url, category_id, link_url) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id",
-            (user_id, post_type, title, content, attribution, license, primary_media_url, category_id, link_url)
+            "INSERT INTO posts (user_id, type, title, content, content_html, excerpt, attribution, license, image_url, category_id, link_url) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s) RETURNING id",
+            (user_id, post_type, title, content, content_html, excerpt, attribution, license, primary_media_url, category_id, link_url)
         )
         post_id = cur.fetchone()[0]
         
@@ -433,7 +1223,10 @@ def create_post():
                 media_records
             )
 
+        scopes = feed_scopes(cur, post_id)
         conn.commit()
+        invalidate_post_caches()  # After the commit, so a concurrent read can't re-cache the old page
+        invalidate_feeds(scopes)
         cur.close()
         return jsonify({"message": "Post created successfully", "post_id": post_id}), 201
     except (Exception, psycopg2.DatabaseError) as error:
@@ -448,7 +1241,6 @@ def create_post():
 @app.route('/posts/<int:post_id>', methods=['PUT'])
 @jwt_required()
 def update_post(post_id):
-    invalidate_post_caches(post_id)  # Invalidate relevant caches
     current_user_id = int(get_jwt_identity())
     data = request.get_json()
 
@@ -482,13 +1274,17 @@ def update_post(post_id):
             return jsonify({"message": "Post not found"}), 404
         if post['user_id'] != current_user_id:
             return jsonify({"message": "Forbidden"}), 403
+        scopes = feed_scopes(cur, post_id)  # Feeds the post leaves (old category/tags) change too
 
         # Update post fields
+        content_html, excerpt = render_content(content)
         cur.execute(
             """
             UPDATE posts
             SET title = %s,
                 content = %s,
+                content_html = %s,
+                excerpt = %s,
                 attribution = %s,
                 license = %s,
                 category_id = %s,
@@ -496,14 +1292,17 @@ def update_post(post_id):
                 type = %s
             WHERE id = %s
             """,
-            (title, content, attribution, license, category_id, link_url, post_type, post_id)
+            (title, content, content_html, excerpt, attribution, license, category_id, link_url, post_type, post_id)
         )
 
         # Update tags (clear + add new ones)
         cur.execute("DELETE FROM post_tags WHERE post_id = %s", (post_id,))
         manage_tags(cur, post_id, tags_string)
 
+        scopes |= feed_scopes(cur, post_id)
         conn.commit()
+        invalidate_post_caches(post_id)
+        invalidate_feeds(scopes)
         cur.close()
         return jsonify({"message": "Post updated successfully"}), 200
 
@@ -518,7 +1317,6 @@ def update_post(post_id):
 @app.route('/posts/<int:post_id>', methods=['DELETE'])
 @jwt_required()
 def delete_post(post_id):
-    invalidate_post_caches(post_id)
     current_user_id = int(get_jwt_identity())
     conn = None
     try:
@@ -532,8 +1330,11 @@ def delete_post(post_id):
             return jsonify({"message": "Forbidden"}), 403
         
         # Deletion logic
+        scopes = feed_scopes(cur, post_id)
         cur.execute("DELETE FROM posts WHERE id = %s", (post_id,))
         conn.commit()
+        invalidate_post_caches(post_id)
+        invalidate_feeds(scopes)
         return jsonify({"message": "Post deleted successfully"})
     except Exception as e:
         print(f"DB Error on delete: {e}")
@@ -544,7 +1345,6 @@ def delete_post(post_id):
 
 # --- Tag Filter Endpoint ---
 @app.route('/posts/tag/<tag_name>', methods=['GET'])
-@cache.cached(timeout=300, key_prefix='tag_posts_')  # Cache tagged posts for 5 minutes
 def get_posts_by_tag(tag_name):
     """Fetches all posts associated with a specific tag."""
     user_id = None
@@ -554,29 +1354,19 @@ def get_posts_by_tag(tag_name):
     except:
         user_id = None
 
+    cache_key = f"tag_posts_{cache_generation('all_posts')}_{tag_name}"  # Cache tagged posts for 5 minutes
+    posts = None if is_pinned_to_primary() else cache.get(cache_key)
+    if posts is not None:
+        return jsonify(feed_posts(posts, user_id))
+
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        sql_query = """
-            SELECT 
-                p.*, u.username,
-                COALESCE(lc.like_count, 0) AS like_count,
-                EXISTS(SELECT 1 FROM post_likes WHERE post_id = p.id AND user_id = %s) AS liked_by_user,
-                ARRAY_AGG(t.name) FILTER (WHERE t.name IS NOT NULL) as tags
-            FROM posts p
-            JOIN users u ON p.user_id = u.id
-            LEFT JOIN (SELECT post_id, COUNT(*) as like_count FROM post_likes GROUP BY post_id) lc 
-                ON p.id = lc.post_id
-            JOIN post_tags pt ON p.id = pt.post_id
-            JOIN tags t ON pt.tag_id = t.id
-            WHERE t.name = %s
-            GROUP BY p.id, u.username, lc.like_count
-            ORDER BY p.created_at DESC;
-        """
-        cur.execute(sql_query, (user_id, tag_name))
+        execute_prepared(cur, 'tag_posts', (tag_name,))
         posts = [dict(post) for post in cur.fetchall()]
-        return jsonify(posts)
+        cache.set(cache_key, posts, timeout=300)
+        return jsonify(feed_posts(posts, user_id, conn))
     except Exception as e:
         print(f"DB Error: {e}")
         return jsonify({'message': 'Failed to retrieve posts.'}), 500
@@ -588,11 +1378,15 @@ def get_posts_by_tag(tag_name):
 # ================================
 
 @app.route('/posts/<int:post_id>/comments', methods=['GET'])
-@cache.cached(timeout=300, key_prefix='post_comments_')  # Cache comments for 5 minutes
 def get_comments(post_id):
+    # Cache comments for 5 minutes under the key invalidate_post_caches clears
+    comments = cache.get(f'post_{post_id}_comments')
+    if comments is not None:
+        return jsonify(comments)
+
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         cur.execute(
             "SELECT c.*, u.username FROM comments c JOIN users u ON c.user_id = u.id "
@@ -600,6 +1394,7 @@ def get_comments(post_id):
             (post_id,)
         )
         comments = [dict(comment) for comment in cur.fetchall()]
+        cache.set(f'post_{post_id}_comments', comments, timeout=300)
         return jsonify(comments)
     except Exception as e:
         print(f"DB Error: {e}")
@@ -610,7 +1405,6 @@ def get_comments(post_id):
 @app.route('/posts/<int:post_id>/comments', methods=['POST'])
 @jwt_required()
 def add_comment(post_id):
-    invalidate_post_caches(post_id)
     user_id = int(get_jwt_identity())
     data = request.get_json()
     if not data or not data.get('content'):
@@ -627,6 +1421,7 @@ def add_comment(post_id):
         )
         new_comment_data = cur.fetchone()
         conn.commit()
+        invalidate_post_caches(post_id)
 
         cur.execute("SELECT username FROM users WHERE id = %s", (user_id,))
         user = cur.fetchone()
@@ -648,7 +1443,6 @@ def add_comment(post_id):
 @app.route('/posts/<int:post_id>/like', methods=['POST'])
 @jwt_required()
 def toggle_like(post_id):
-    invalidate_post_caches(post_id)  # Invalidate relevant caches
     user_id = int(get_jwt_identity())
     conn = None
     try:
@@ -663,6 +1457,8 @@ def toggle_like(post_id):
             cur.execute("INSERT INTO post_likes (user_id, post_id) VALUES (%s, %s)", (user_id, post_id))
             liked = True
         conn.commit()
+        invalidate_post_caches(post_id)
+        update_liked_set(user_id, post_id, liked)
 
         cur.execute("SELECT COUNT(*) FROM post_likes WHERE post_id = %s", (post_id,))
         like_count = cur.fetchone()[0]
@@ -691,17 +1487,21 @@ def upload_media():
         return jsonify({"message": "No file selected for uploading"}), 400
 
     if file and allowed_file(file.filename):
-        # Sanitize filename and make it unique to prevent overwrites
-        import uuid
+        # Sanitize filename and prefix it with a content hash: identical uploads share one file,
+        # and a name never changes content, so it can be cached forever
         filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
+        unique_filename = f"{content_hash(file)}_{filename}"
 
         # --- S3 Upload Logic (for production on Vercel) ---
         if s3_client:
             try:
                 s3_client.upload_fileobj(
                     file, S3_BUCKET, unique_filename,
-                    ExtraArgs={"ACL": "public-read", "ContentType": file.content_type}
+                    ExtraArgs={
+                        "ACL": "public-read",
+                        "ContentType": file.content_type,
+                        "CacheControl": f"public, max-age={MEDIA_IMMUTABLE_MAX_AGE}, immutable",
+                    }
                 )
                 file_url = f"https://{S3_BUCKET}.s3.amazonaws.com/{unique_filename}"
                 return jsonify({"message": "File uploaded successfully to S3", "file_url": file_url}), 201
@@ -717,6 +1517,85 @@ def upload_media():
     else:
         return jsonify({"message": "File type not allowed"}), 400
 
+def _read_range(f, length, chunk_size=1 << 16):
+    """Yields exactly `length` bytes from the current position of f, then closes it"""
+    try:
+        while length > 0:
+            chunk = f.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+@app.route('/uploads/<path:filename>', methods=['GET', 'HEAD'])
+def serve_upload(filename):
+    """
+    Serves a locally stored upload with Range/206 support, strong ETags and long-lived caching.
+    Bodies are sent zero-copy where possible (see MEDIA_ACCEL_MODE).
+    """
+    path = safe_join(app.config['UPLOAD_FOLDER'], filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({"message": "File not found"}), 404
+
+    stat = os.stat(path)
+    name = os.path.basename(path)
+    hashed = _HASHED_UPLOAD_RE.match(name)
+    etag = hashed.group(1) if hashed else f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+    last_modified = datetime.fromtimestamp(int(stat.st_mtime), timezone.utc)
+
+    response = Response(mimetype=mimetypes.guess_type(name)[0] or 'application/octet-stream',
+                        direct_passthrough=True)
+    response.set_etag(etag)  # Strong: the bytes behind a name never change
+    response.last_modified = last_modified
+    response.accept_ranges = 'bytes'
+    response.cache_control.public = True
+    if hashed or _UUID_UPLOAD_RE.match(name):
+        response.cache_control.max_age = MEDIA_IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.max_age = MEDIA_MAX_AGE
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response.status_code = 304
+        return response
+
+    # Let the fronting server stream the file (it also handles Range itself)
+    if MEDIA_ACCEL_MODE == 'nginx':
+        response.headers['X-Accel-Redirect'] = MEDIA_ACCEL_PREFIX + quote(os.path.relpath(path, app.config['UPLOAD_FOLDER']))
+        return response
+    if MEDIA_ACCEL_MODE == 'sendfile':
+        response.headers['X-Sendfile'] = path
+        return response
+
+    start, length = 0, stat.st_size
+    # Unparseable and multi-range headers are ignored and the whole file is sent with a 200
+    byte_range = request.range
+    range_applies = byte_range is not None and len(byte_range.ranges) == 1 and stat.st_size and (
+        'HTTP_IF_RANGE' not in request.environ
+        or not is_resource_modified(request.environ, etag=etag, last_modified=last_modified, ignore_if_range=False)
+    )
+    if range_applies:
+        span = byte_range.range_for_length(stat.st_size)
+        if span is None:  # Starts past the end of the file
+            raise RequestedRangeNotSatisfiable(length=stat.st_size)
+        start, length = span[0], span[1] - span[0]
+        response.status_code = 206
+        response.content_range = byte_range.to_content_range_header(stat.st_size)
+
+    f = open(path, 'rb')
+    f.seek(start)
+    response.content_length = length
+    response.call_on_close(f.close)  # HEAD responses never iterate the body
+    if start + length == stat.st_size or request.environ.get('SERVER_SOFTWARE', '').startswith('gunicorn'):
+        # Full file or a suffix: the server's file_wrapper (sendfile() under gunicorn) can stream it from
+        # the current offset. gunicorn also caps sendfile() at Content-Length, so any range works there.
+        response.response = wrap_file(request.environ, f)
+    else:
+        response.response = _read_range(f, length)
+    return response
+
 # ====================================================================
 # --- Categories Endpoint ---
 # ====================================================================
@@ -726,7 +1605,7 @@ def get_categories():
     """Fetches all available categories."""
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         cur.execute("SELECT id, name, slug FROM categories ORDER BY name ASC")
         categories = [dict(cat) for cat in cur.fetchall()]
@@ -741,7 +1620,6 @@ def get_categories():
 # --- Category Posts Endpoint ---
 # ====================================================================
 @app.route('/posts/category/<category_slug>', methods=['GET'])
-@cache.cached(timeout=300, key_prefix='category_posts_')
 def get_posts_by_category(category_slug):
     """Fetches all posts associated with a specific category slug."""
     user_id = None
@@ -751,60 +1629,483 @@ def get_posts_by_category(category_slug):
     except:
         user_id = None
 
+    cache_key = f"category_posts_{cache_generation('all_posts')}_{category_slug}"
+    payload = None if is_pinned_to_primary() else cache.get(cache_key)
+    if payload is not None:
+        return jsonify(dict(payload, posts=feed_posts(payload['posts'], user_id)))
+
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
         
-        cur.execute("SELECT name FROM categories WHERE slug = %s", (category_slug,))
+        execute_prepared(cur, 'category_by_slug', (category_slug,))
         category = cur.fetchone()
         if not category:
             return jsonify({"message": "Category not found"}), 404
         category_name = category['name']
 
-        sql_query = """
-            SELECT 
-                p.*, u.username, cat.name as category_name, cat.slug as category_slug,
-                COALESCE(lc.like_count, 0) AS like_count,
-                EXISTS(SELECT 1 FROM post_likes WHERE post_id = p.id AND user_id = %s) AS liked_by_user,
-                ARRAY_AGG(DISTINCT t.name) FILTER (WHERE t.name IS NOT NULL) as tags,
-                ARRAY_AGG(DISTINCT pm.media_url) FILTER (WHERE pm.media_url IS NOT NULL) as media_urls
-            FROM posts p
-            JOIN users u ON p.user_id = u.id
-            JOIN categories cat ON p.category_id = cat.id
-            LEFT JOIN (SELECT post_id, COUNT(*) as like_count FROM post_likes GROUP BY post_id) lc ON p.id = lc.post_id
-            LEFT JOIN post_tags pt ON p.id = pt.post_id
-            LEFT JOIN tags t ON pt.tag_id = t.id
-            LEFT JOIN post_media pm ON p.id = pm.post_id
-            WHERE cat.slug = %s
-            GROUP BY p.id, u.username, lc.like_count, cat.name, cat.slug
-            ORDER BY p.created_at DESC;
-        """
-        cur.execute(sql_query, (user_id, category_slug))
+        execute_prepared(cur, 'category_posts', (category_slug,))
         posts = [dict(post) for post in cur.fetchall()]
-        
-        return jsonify({"posts": posts, "category_name": category_name})
+
+        payload = {"posts": posts, "category_name": category_name}
+        cache.set(cache_key, payload, timeout=300)
+        return jsonify(dict(payload, posts=feed_posts(posts, user_id, conn)))
     except Exception as e:
         print(f"DB Error fetching posts by category: {e}")
         return jsonify({'message': 'Failed to retrieve posts.'}), 500
     finally:
         if conn: conn.close()
 
+# ====================================================================
+# --- Popular Posts Endpoint ---
+# ====================================================================
+# Rankings live in the post_popularity summary table. A periodic job keeps it up to date:
+# engagement counts are re-aggregated only for posts that changed since the last refresh,
+# then every post in the window is re-scored (time decay) and re-ranked in one statement.
+POPULAR_WINDOW_DAYS = int(os.getenv('POPULAR_WINDOW_DAYS', '14'))  # Older posts drop out of the ranking
+POPULAR_REFRESH_SECONDS = int(os.getenv('POPULAR_REFRESH_SECONDS', '300'))
+POPULAR_FULL_REFRESH_EVERY = 12  # Every Nth refresh re-aggregates everything (catches unlikes)
+POPULAR_GRAVITY = 1.5  # Higher values make scores decay faster with age
+POPULAR_WEIGHTS = {'likes': 3.0, 'comments': 2.0, 'webmentions': 4.0, 'views': 0.1}
+POPULAR_REFRESH_LOCK_ID = 7281001  # pg advisory lock key so only one worker refreshes at a time
+_popular_refresh_runs = 0
+
+def refresh_popular_posts(full=False):
+    """Brings post_popularity up to date and re-ranks it. Returns the number of ranked posts."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (POPULAR_REFRESH_LOCK_ID,))
+        if not cur.fetchone()[0]:
+            return None  # Another worker is already refreshing
+
+        cur.execute("SELECT MAX(refreshed_at) FROM post_popularity")
+        since = cur.fetchone()[0]
+        if full or since is None:
+            since = '-infinity'
+
+        cur.execute("DELETE FROM post_popularity WHERE created_at < NOW() - make_interval(days => %s)",
+                    (POPULAR_WINDOW_DAYS,))
+
+        # Re-aggregate counts only for posts that saw activity since the last refresh.
+        # posts.updated_at moves on every edit and view_count bump (update_posts_updated_at trigger).
+        cur.execute("""
+            WITH changed AS (
+                SELECT id AS post_id FROM posts WHERE updated_at > %(since)s
+                UNION SELECT post_id FROM post_likes WHERE created_at > %(since)s
+                UNION SELECT post_id FROM comments WHERE created_at > %(since)s
+                UNION SELECT post_id FROM webmentions WHERE received_at > %(since)s
+            )
+            INSERT INTO post_popularity (post_id, category_id, created_at, likes, comments, webmentions, views, refreshed_at)
+            SELECT p.id, p.category_id, p.created_at,
+                (SELECT COUNT(*) FROM post_likes WHERE post_id = p.id),
+                (SELECT COUNT(*) FROM comments WHERE post_id = p.id),
+                (SELECT COUNT(*) FROM webmentions WHERE post_id = p.id AND verified = true),
+                COALESCE(p.view_count, 0),
+                NOW()
+            FROM changed c
+            JOIN posts p ON p.id = c.post_id
+            WHERE p.created_at >= NOW() - make_interval(days => %(window_days)s)
+            ON CONFLICT (post_id) DO UPDATE SET
+                category_id = EXCLUDED.category_id,
+                likes = EXCLUDED.likes,
+                comments = EXCLUDED.comments,
+                webmentions = EXCLUDED.webmentions,
+                views = EXCLUDED.views,
+                refreshed_at = EXCLUDED.refreshed_at
+        """, {'since': since, 'window_days': POPULAR_WINDOW_DAYS})
+
+        # Decay moves every score, so re-score and re-rank the whole (bounded) window from the stored counts.
+        cur.execute("""
+            UPDATE post_popularity pp
+            SET score = ranked.score, site_rank = ranked.site_rank, category_rank = ranked.category_rank
+            FROM (
+                SELECT post_id, score,
+                    ROW_NUMBER() OVER (ORDER BY score DESC, post_id DESC) AS site_rank,
+                    ROW_NUMBER() OVER (PARTITION BY category_id ORDER BY score DESC, post_id DESC) AS category_rank
+                FROM (
+                    SELECT post_id, category_id,
+                        (likes * %(likes)s + comments * %(comments)s + webmentions * %(webmentions)s
+                            + views * %(views)s + 1)
+                        / POWER(EXTRACT(EPOCH FROM (NOW() - created_at)) / 3600.0 + 2, %(gravity)s) AS score
+                    FROM post_popularity
+                ) scored
+            ) ranked
+            WHERE ranked.post_id = pp.post_id
+        """, dict(POPULAR_WEIGHTS, gravity=POPULAR_GRAVITY))
+        ranked = cur.rowcount
+        conn.commit()
+        cache.delete('popular_posts')  # New generation of cached popular pages
+        return ranked
+    finally:
+        if conn: conn.close()
+
+@periodic_job('refresh_popular_posts', POPULAR_REFRESH_SECONDS)
+def scheduled_popular_refresh():
+    global _popular_refresh_runs
+    _popular_refresh_runs += 1
+    refresh_popular_posts(full=_popular_refresh_runs % POPULAR_FULL_REFRESH_EVERY == 0)
+
+@app.cli.command('refresh-popular')
+def refresh_popular_command():
+    """Fully recomputes the popular posts ranking."""
+    ranked = refresh_popular_posts(full=True)
+    print("Another refresh is in progress" if ranked is None else f"Ranked {ranked} posts")
+
+@app.route('/posts/popular', methods=['GET'])
+def get_popular_posts():
+    """Serves a page of the precomputed trending ranking, optionally within one category."""
+    user_id = None
+    try:
+        verify_jwt_in_request(optional=True)
+        user_id = get_jwt_identity()
+    except Exception: # nosec
+        user_id = None
+
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 10, type=int), 1), 50)
+    category_slug = request.args.get('category', None, type=str)
+    first_rank = (page - 1) * per_page + 1
+    last_rank = first_rank + per_page  # One extra row tells us whether there is a next page
+
+    cache_key = f"popular_posts_{cache_generation('popular_posts')}_{category_slug or '*'}_{page}_{per_page}"
+    conn = None
+    try:
+        payload = cache.get(cache_key)
+        if payload is None:
+            conn = get_db_connection(readonly=True)
+            cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+            # Ranks are dense, so a page is an index range scan no matter how deep it is
+            if category_slug:
+                cur.execute("""
+                    SELECT pp.post_id, pp.score FROM post_popularity pp
+                    JOIN categories cat ON cat.id = pp.category_id
+                    WHERE cat.slug = %s AND pp.category_rank BETWEEN %s AND %s
+                    ORDER BY pp.category_rank
+                """, (category_slug, first_rank, last_rank))
+            else:
+                cur.execute("""
+                    SELECT post_id, score FROM post_popularity
+                    WHERE site_rank BETWEEN %s AND %s
+                    ORDER BY site_rank
+                """, (first_rank, last_rank))
+            ranking = cur.fetchall()
+            has_more = len(ranking) > per_page
+            ranking = ranking[:per_page]
+            post_ids = [row['post_id'] for row in ranking]
+
+            posts_by_id = {}
+            if post_ids:
+                cur.execute("""
+                    SELECT
+                        p.*,
+                        u.username,
+                        cat.name as category_name, cat.slug as category_slug,
+                        (SELECT COUNT(*) FROM post_likes WHERE post_id = p.id) AS like_count,
+                        ARRAY(SELECT t.name FROM post_tags pt JOIN tags t ON pt.tag_id = t.id WHERE pt.post_id = p.id) AS tags,
+                        ARRAY(SELECT pm.media_url FROM post_media pm WHERE pm.post_id = p.id ORDER BY pm.id) AS media_urls
+                    FROM posts p
+                    JOIN users u ON p.user_id = u.id
+                    LEFT JOIN categories cat ON p.category_id = cat.id
+                    WHERE p.id = ANY(%s)
+                """, (post_ids,))
+                posts_by_id = {row['id']: dict(row) for row in cur.fetchall()}
+
+            posts = []
+            for row in ranking:
+                post = posts_by_id.get(row['post_id'])
+                if post:  # Deleted since the last refresh
+                    post['popularity_score'] = row['score']
+                    posts.append(post)
+            payload = {"posts": posts, "has_more": has_more}
+            cache.set(cache_key, payload, timeout=POPULAR_REFRESH_SECONDS)
+
+        posts = feed_posts(payload['posts'], user_id, conn)
+        return jsonify({"posts": posts, "has_more": payload['has_more'], "page": page})
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"DATABASE ERROR fetching popular posts: {error}")
+        return jsonify({'message': 'Failed to retrieve popular posts.'}), 500
+    finally:
+        if conn: conn.close()
+
+# ====================================================================
+# --- View Analytics ---
+# ====================================================================
+# post_view_events is append-only and range-partitioned by UTC day. A periodic job keeps partitions
+# created a few days ahead, folds new events into post_views_hourly / post_views_daily (and
+# posts.view_count), then drops event partitions once they are rolled up and past retention.
+# The analytics endpoints read only the rollup tables.
+VIEW_ROLLUP_SECONDS = int(os.getenv('VIEW_ROLLUP_SECONDS', '300'))
+VIEW_ROLLUP_GRACE_SECONDS = VIEW_FLUSH_SECONDS + 60  # Newer events may still be buffered or uncommitted
+VIEW_EVENTS_RETENTION_DAYS = int(os.getenv('VIEW_EVENTS_RETENTION_DAYS', '7'))
+VIEW_HOURLY_RETENTION_DAYS = int(os.getenv('VIEW_HOURLY_RETENTION_DAYS', '90'))
+VIEW_DAILY_MAX_DAYS = 365
+VIEW_PARTITIONS_AHEAD = 3
+VIEW_ROLLUP_LOCK_ID = 7281002  # pg advisory lock key so only one worker rolls up at a time
+_VIEW_PARTITION_RE = re.compile(r'^post_view_events_p(\d{8})$')
+
+def _view_partitions(cur):
+    """Daily partitions of post_view_events as {name: first day}"""
+    cur.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'post_view_events'::regclass
+    """)
+    partitions = {}
+    for (name,) in cur.fetchall():
+        match = _VIEW_PARTITION_RE.match(name)
+        if match:
+            partitions[name] = datetime.strptime(match.group(1), '%Y%m%d').replace(tzinfo=timezone.utc)
+    return partitions
+
+def ensure_view_partitions(cur):
+    """Creates the daily partitions from today through VIEW_PARTITIONS_AHEAD days out"""
+    existing = _view_partitions(cur)
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    for offset in range(VIEW_PARTITIONS_AHEAD + 1):
+        start = today + timedelta(days=offset)
+        name = f"post_view_events_p{start:%Y%m%d}"
+        if name in existing:
+            continue
+        end = start + timedelta(days=1)
+        cur.execute(f"CREATE TABLE {name} (LIKE post_view_events INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        # Rows the default partition caught for this day (job was down) must move before ATTACH accepts the range
+        cur.execute(f"""
+            WITH moved AS (
+                DELETE FROM post_view_events_default WHERE viewed_at >= %s AND viewed_at < %s RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+        """, (start, end))
+        cur.execute(f"ALTER TABLE post_view_events ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)",
+                    (start, end))
+
+def rollup_view_events():
+    """Rolls new view events up into the hourly/daily tables and expires old data. Returns views rolled up."""
+    conn = None
+    try:
+        conn = get_db_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT pg_try_advisory_xact_lock(%s)", (VIEW_ROLLUP_LOCK_ID,))
+        if not cur.fetchone()[0]:
+            return None  # Another worker is already rolling up
+        cur.execute("SET LOCAL TimeZone = 'UTC'")  # Hour and day buckets are UTC
+        ensure_view_partitions(cur)
+
+        cur.execute("SELECT rolled_up_to, NOW() - make_interval(secs => %s) FROM view_rollup_state FOR UPDATE",
+                    (VIEW_ROLLUP_GRACE_SECONDS,))
+        rolled_up_to, rollup_to = cur.fetchone()
+
+        # Author is denormalized into the rollups so per-author series don't need to touch posts
+        cur.execute("""
+            CREATE TEMP TABLE view_increments ON COMMIT DROP AS
+            SELECT e.post_id, p.user_id AS author_id, date_trunc('hour', e.viewed_at) AS hour,
+                COUNT(*) AS views, COUNT(*) FILTER (WHERE e.user_id IS NULL) AS anonymous_views
+            FROM post_view_events e
+            JOIN posts p ON p.id = e.post_id
+            WHERE e.viewed_at >= %s AND e.viewed_at < %s
+            GROUP BY e.post_id, p.user_id, date_trunc('hour', e.viewed_at)
+        """, (rolled_up_to, rollup_to))
+        cur.execute("""
+            INSERT INTO post_views_hourly (post_id, author_id, hour, views, anonymous_views)
+            SELECT post_id, author_id, hour, views, anonymous_views FROM view_increments
+            ON CONFLICT (post_id, hour) DO UPDATE SET
+                views = post_views_hourly.views + EXCLUDED.views,
+                anonymous_views = post_views_hourly.anonymous_views + EXCLUDED.anonymous_views
+        """)
+        cur.execute("""
+            INSERT INTO post_views_daily (post_id, author_id, day, views, anonymous_views)
+            SELECT post_id, author_id, hour::date, SUM(views), SUM(anonymous_views) FROM view_increments
+            GROUP BY post_id, author_id, hour::date
+            ON CONFLICT (post_id, day) DO UPDATE SET
+                views = post_views_daily.views + EXCLUDED.views,
+                anonymous_views = post_views_daily.anonymous_views + EXCLUDED.anonymous_views
+        """)
+        cur.execute("""
+            UPDATE posts p SET view_count = COALESCE(p.view_count, 0) + v.views
+            FROM (SELECT post_id, SUM(views) AS views FROM view_increments GROUP BY post_id) v
+            WHERE p.id = v.post_id
+            RETURNING v.views
+        """)
+        rolled_up = sum(row[0] for row in cur.fetchall())
+        cur.execute("UPDATE view_rollup_state SET rolled_up_to = %s", (rollup_to,))
+
+        # Raw events are only kept while they are recent; everything older lives on in the rollups
+        events_cutoff = rollup_to - timedelta(days=VIEW_EVENTS_RETENTION_DAYS)
+        for name, start in _view_partitions(cur).items():
+            if start + timedelta(days=1) <= events_cutoff:
+                cur.execute(f"DROP TABLE {name}")
+        cur.execute("DELETE FROM post_view_events_default WHERE viewed_at < %s", (events_cutoff,))
+        cur.execute("DELETE FROM post_views_hourly WHERE hour < NOW() - make_interval(days => %s)",
+                    (VIEW_HOURLY_RETENTION_DAYS,))
+        conn.commit()
+        cache.delete('view_rollups')  # New generation of cached view series
+        return rolled_up
+    finally:
+        if conn: conn.close()
+
+@periodic_job('rollup_view_events', VIEW_ROLLUP_SECONDS)
+def scheduled_view_rollup():
+    rollup_view_events()
+
+@app.cli.command('rollup-views')
+def rollup_views_command():
+    """Rolls up pending view events and expires old partitions."""
+    flush_view_events()
+    rolled_up = rollup_view_events()
+    print("Another rollup is in progress" if rolled_up is None else f"Rolled up {rolled_up} views")
+
+def _view_series(owner_column, owner_id):
+    """Zero-filled views per hour or day for one post or author, read from the rollups"""
+    granularity = request.args.get('granularity', 'day', type=str)
+    if granularity not in ('hour', 'day'):
+        return jsonify({"message": "granularity must be 'hour' or 'day'"}), 400
+    max_days = VIEW_HOURLY_RETENTION_DAYS if granularity == 'hour' else VIEW_DAILY_MAX_DAYS
+    days = min(max(request.args.get('days', 2 if granularity == 'hour' else 30, type=int), 1), max_days)
+
+    cache_key = f"views_{cache_generation('view_rollups')}_{owner_column}_{owner_id}_{granularity}_{days}"
+    payload = cache.get(cache_key)
+    if payload is not None:
+        return jsonify(payload)
+
+    conn = None
+    try:
+        conn = get_db_connection(readonly=True)
+        cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+        cur.execute("SET LOCAL TimeZone = 'UTC'")
+        if granularity == 'hour':
+            cur.execute(f"""
+                SELECT b.bucket, COALESCE(SUM(v.views), 0) AS views,
+                    COALESCE(SUM(v.anonymous_views), 0) AS anonymous_views
+                FROM generate_series(date_trunc('hour', NOW()) - make_interval(hours => %(hours)s - 1),
+                                     date_trunc('hour', NOW()), interval '1 hour') AS b(bucket)
+                LEFT JOIN post_views_hourly v ON v.hour = b.bucket AND v.{owner_column} = %(owner_id)s
+                GROUP BY b.bucket ORDER BY b.bucket
+            """, {'hours': days * 24, 'owner_id': owner_id})
+        else:
+            cur.execute(f"""
+                SELECT b.bucket::date AS bucket, COALESCE(SUM(v.views), 0) AS views,
+                    COALESCE(SUM(v.anonymous_views), 0) AS anonymous_views
+                FROM generate_series(CURRENT_DATE - (%(days)s - 1), CURRENT_DATE, interval '1 day') AS b(bucket)
+                LEFT JOIN post_views_daily v ON v.day = b.bucket::date AND v.{owner_column} = %(owner_id)s
+                GROUP BY b.bucket ORDER BY b.bucket
+            """, {'days': days, 'owner_id': owner_id})
+        series = [
+            {"bucket": row['bucket'].isoformat(), "views": int(row['views']), "anonymous_views": int(row['anonymous_views'])}
+            for row in cur.fetchall()
+        ]
+        payload = {
+            owner_column: owner_id,
+            "granularity": granularity,
+            "series": series,
+            "total_views": sum(point['views'] for point in series),
+        }
+        cache.set(cache_key, payload, timeout=VIEW_ROLLUP_SECONDS)
+        return jsonify(payload)
+    except (Exception, psycopg2.DatabaseError) as error:
+        print(f"DATABASE ERROR fetching view series: {error}")
+        return jsonify({'message': 'Failed to retrieve view statistics.'}), 500
+    finally:
+        if conn: conn.close()
+
+@app.route('/posts/<int:post_id>/views', methods=['GET'])
+def get_post_views(post_id):
+    """Views over time for one post: ?granularity=hour|day&days=N"""
+    return _view_series('post_id', post_id)
+
+@app.route('/users/<int:user_id>/views', methods=['GET'])
+def get_author_views(user_id):
+    """Views over time across all of an author's posts: ?granularity=hour|day&days=N"""
+    return _view_series('author_id', user_id)
+
+# ====================================================================
+# --- Request Batching Endpoint ---
+# ====================================================================
+MAX_BATCH_REQUESTS = 20
+# Only JSON read endpoints can be batched; uploads, feeds and anything with side effects must be called directly
+BATCH_ENDPOINTS = {
+    'get_posts', 'get_posts_batch', 'get_post', 'get_posts_by_tag', 'get_comments', 'get_categories',
+    'get_posts_by_category', 'get_popular_posts', 'get_post_views', 'get_author_views', 'get_webmentions',
+}
+
+@app.route('/batch', methods=['POST'])
+def batch_requests():
+    """
+    Runs several read-only sub-requests in one round trip, e.g.
+    {"requests": [{"path": "/posts/1"}, {"path": "/posts/1/comments"}, {"path": "/posts/1/webmentions"}]}
+    Sub-requests share this request's auth header, cookies, client address and a single pooled connection.
+    Only the JSON read endpoints in BATCH_ENDPOINTS can be batched.
+    """
+    data = request.get_json(silent=True) or {}
+    sub_requests = data.get('requests')
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return jsonify({"message": "Body must contain a non-empty 'requests' list"}), 400
+    if len(sub_requests) > MAX_BATCH_REQUESTS:
+        return jsonify({"message": f"At most {MAX_BATCH_REQUESTS} requests per batch"}), 400
+
+    headers = {}
+    for name in ('Authorization', 'Cookie'):
+        if name in request.headers:
+            headers[name] = request.headers[name]
+    # Sub-requests skip the WSGI middleware, so hand them the client address ProxyFix already resolved
+    environ_base = {'REMOTE_ADDR': request.remote_addr}
+
+    responses = []
+    try:
+        g.batch_connection = None  # Opened by the first sub-request that needs the database
+        for sub_request in sub_requests:
+            path = sub_request.get('path') if isinstance(sub_request, dict) else None
+            if not isinstance(path, str) or not path.startswith('/') or path.split('?', 1)[0] == '/batch':
+                responses.append({"path": path, "status": 400, "body": {"message": "Invalid path"}})
+                continue
+
+            # Dispatch inside a nested request context: it shares this app context (and so g),
+            # which is how get_db_connection finds the batch connection
+            with app.test_request_context(path, method='GET', headers=headers, base_url=request.host_url,
+                                          environ_base=environ_base):
+                if request.routing_exception is None and request.endpoint not in BATCH_ENDPOINTS:
+                    responses.append({"path": path, "status": 400, "body": {"message": "Endpoint can't be batched"}})
+                    continue
+                try:
+                    rv = app.dispatch_request()
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.make_response(rv)
+            try:
+                body = response.get_json(silent=True) if response.is_json else response.get_data(as_text=True)
+                responses.append({"path": path, "status": response.status_code, "body": body})
+            finally:
+                response.close()
+    finally:
+        batch_connection = g.pop('batch_connection', None)
+        if batch_connection is not None:
+            batch_connection.close()
+        if view_flush_due():
+            flush_view_events()
+
+    return jsonify({"responses": responses})
+
 # ====================================================================
 # --- Webmention Endpoints ---
 # ====================================================================
-@app.route('/webmention', methods=['POST'])
-def receive_webmention():
-    """Handle incoming webmentions."""
-    data = request.get_json()
-    print("Received webmention data:", data)  # Debug print
-    
-    # Validate required fields
-    if not data or 'source' not in data or 'target' not in data:
-        return jsonify({"message": "Missing required fields (source and target)"}), 400
-    
+# Mentions are unique per (source_url, target_url): a source re-sending its ping updates the
+# existing row instead of adding another one.
+MAX_BULK_WEBMENTIONS = 500
+WEBMENTIONS_PAGE_SIZE = 50
+MAX_WEBMENTIONS_PAGE_SIZE = 200
+
+def parse_webmention(data):
+    """Validates one mention payload. Returns (row, None) or (None, error message)."""
+    if not isinstance(data, dict) or 'source' not in data or 'target' not in data:
+        return None, "Missing required fields (source and target)"
+
     source_url = data['source']
     target_url = data['target']
+    for url in (source_url, target_url):
+        if not isinstance(url, str) or not url.startswith(('http://', 'https://')):
+            return None, "Source and target must be http(s) URLs"
     mention_type = data.get('type', 'mention')
     author_info = data.get('author', {})
     if isinstance(author_info, dict):
@@ -814,68 +2115,363 @@ def receive_webmention():
     else:
         author_name = author_url = author_photo = None
     content = data.get('content')
-    
+
     # Extract post ID from target URL
     try:
         # This logic assumes a URL structure like /posts/123 at the end
         path_parts = target_url.split('/')
         post_id = int(path_parts[-1] or path_parts[-2])
-    except (ValueError, IndexError):
-        return jsonify({"message": "Invalid target URL format"}), 400
-    
+    except (AttributeError, ValueError, IndexError):
+        return None, "Invalid target URL format"
+
+    # When the source publication time is unknown, the mention counts as published on arrival
+    published_at = None
+    if data.get('published'):
+        try:
+            published_at = datetime.fromisoformat(data['published'])
+        except (TypeError, ValueError):
+            return None, "Invalid published timestamp (expected ISO 8601)"
+        if published_at.tzinfo is None:
+            published_at = published_at.replace(tzinfo=timezone.utc)
+
+    return (post_id, source_url, target_url, mention_type, author_name, author_url, author_photo,
+            content, published_at), None
+
+def upsert_webmentions(cur, rows):
+    """
+    Inserts or refreshes parse_webmention rows in one statement. Returns [(id, post_id, inserted)].
+    rows must be unique per (source_url, target_url). A refresh without a published time keeps the stored one.
+    """
+    return psycopg2.extras.execute_values(cur, """
+        WITH incoming (post_id, source_url, target_url, mention_type, author_name, author_url, author_photo,
+                       content, published_at) AS (VALUES %s)
+        INSERT INTO webmentions
+        (post_id, source_url, target_url, mention_type, author_name, author_url, author_photo, content, published_at, verified)
+        SELECT post_id, source_url, target_url, mention_type, author_name, author_url, author_photo,
+               content, COALESCE(published_at, NOW()), true
+        FROM incoming
+        ON CONFLICT (source_url, target_url) DO UPDATE SET
+            post_id = EXCLUDED.post_id,
+            mention_type = EXCLUDED.mention_type,
+            author_name = EXCLUDED.author_name,
+            author_url = EXCLUDED.author_url,
+            author_photo = EXCLUDED.author_photo,
+            content = EXCLUDED.content,
+            published_at = COALESCE(
+                (SELECT i.published_at FROM incoming i
+                 WHERE i.source_url = EXCLUDED.source_url AND i.target_url = EXCLUDED.target_url),
+                webmentions.published_at
+            ),
+            received_at = NOW(),
+            verified = true
+        RETURNING id, post_id, (xmax = 0) AS inserted
+    """, rows, template="(%s::integer, %s::text, %s::text, %s::text, %s::text, %s::text, %s::text, %s::text, %s::timestamptz)",
+        page_size=MAX_BULK_WEBMENTIONS, fetch=True)
+
+@app.route('/webmention', methods=['POST'])
+def receive_webmention():
+    """Handle incoming webmentions. Re-sending the same source and target updates the existing mention."""
+    data = request.get_json()
+    print("Received webmention data:", data)  # Debug print
+
+    row, error = parse_webmention(data)
+    if error:
+        return jsonify({"message": error}), 400
+
     conn = None
     try:
         conn = get_db_connection()
         cur = conn.cursor()
-        
-        cur.execute("SELECT id FROM posts WHERE id = %s", (post_id,))
+
+        cur.execute("SELECT id FROM posts WHERE id = %s", (row[0],))
         post = cur.fetchone()
         if not post: return jsonify({"message": "Target post not found"}), 404
-        
-        insert_query = """
-            INSERT INTO webmentions 
-            (post_id, source_url, target_url, mention_type, author_name, author_url, author_photo, content, verified)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, true)
-            RETURNING id
-        """
-        values = (post_id, source_url, target_url, mention_type, author_name, author_url, author_photo, content)
-        cur.execute(insert_query, values)
-        webmention_id = cur.fetchone()[0]
+
+        webmention_id, _, inserted = upsert_webmentions(cur, [row])[0]
         conn.commit()
-        
-        invalidate_post_caches(post_id)
-        
-        return jsonify({"message": "Webmention received successfully", "id": webmention_id}), 201
-        
+
+        invalidate_post_caches(row[0])
+
+        if inserted:
+            return jsonify({"message": "Webmention received successfully", "id": webmention_id}), 201
+        return jsonify({"message": "Webmention updated", "id": webmention_id}), 200
+
     except Exception as e:
         print(f"Error processing webmention: {e}")
         return jsonify({"message": "Error processing webmention"}), 500
     finally:
         if conn: conn.close()
 
+@app.route('/webmentions/bulk', methods=['POST'])
+@jwt_required()
+def receive_webmentions_bulk():
+    """
+    Ingests many webmentions at once: {"mentions": [{"source": ..., "target": ..., ...}, ...]}
+    Each mention is upserted on (source, target), so re-sending a batch is harmless.
+    """
+    data = request.get_json(silent=True) or {}
+    mentions = data.get('mentions')
+    if not isinstance(mentions, list) or not mentions:
+        return jsonify({"message": "Body must contain a non-empty 'mentions' list"}), 400
+    if len(mentions) > MAX_BULK_WEBMENTIONS:
+        return jsonify({"message": f"At most {MAX_BULK_WEBMENTIONS} mentions per request"}), 400
+
+    rejected = []
+    rows_by_key = {}  # (source, target) -> (index, row); the last copy of a duplicate wins
+    for index, mention in enumerate(mentions):
+        row, error = parse_webmention(mention)
+        if error:
+            rejected.append({"index": index, "message": error})
+        else:
+            rows_by_key.pop((row[1], row[2]), None)  # Keep request order for the surviving copy
+            rows_by_key[(row[1], row[2])] = (index, row)
+
+    conn = None
+    try:
+        inserted = updated = 0
+        if rows_by_key:
+            conn = get_db_connection()
+            cur = conn.cursor()
+            cur.execute("SELECT id FROM posts WHERE id = ANY(%s)",
+                        (list({row[0] for _, row in rows_by_key.values()}),))
+            existing = {post_id for (post_id,) in cur.fetchall()}
+            rows = []
+            for index, row in rows_by_key.values():
+                if row[0] in existing:
+                    rows.append(row)
+                else:
+                    rejected.append({"index": index, "message": "Target post not found"})
+
+            results = upsert_webmentions(cur, rows) if rows else []
+            conn.commit()
+            inserted = sum(1 for _, _, was_inserted in results if was_inserted)
+            updated = len(results) - inserted
+            for post_id in {post_id for _, post_id, _ in results}:
+                invalidate_post_caches(post_id)
+
+        return jsonify({
+            "received": len(mentions),
+            "duplicates": len(mentions) - len(rejected) - inserted - updated,
+            "inserted": inserted,
+            "updated": updated,
+            "rejected": sorted(rejected, key=lambda item: item['index']),
+        })
+    except Exception as e:
+        print(f"Error processing bulk webmentions: {e}")
+        return jsonify({"message": "Error processing webmentions"}), 500
+    finally:
+        if conn: conn.close()
+
 @app.route('/posts/<int:post_id>/webmentions', methods=['GET'])
 def get_webmentions(post_id):
-    """Get all webmentions for a post."""
+    """
+    Get a post's webmentions, newest first: ?limit=N&before=<cursor>
+    The cursor for the next page is sent in a Link: <...>; rel="next" header.
+    """
+    limit = min(max(request.args.get('limit', WEBMENTIONS_PAGE_SIZE, type=int), 1), MAX_WEBMENTIONS_PAGE_SIZE)
+    cursor = request.args.get('before', None, type=str)
+    if cursor:
+        try:
+            published_at, last_id = cursor.rsplit(',', 1)
+            published_at, last_id = datetime.fromisoformat(published_at), int(last_id)
+        except ValueError:
+            return jsonify({"message": "Invalid cursor"}), 400
+
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
-        
-        cur.execute("""
-            SELECT * FROM webmentions 
-            WHERE post_id = %s AND verified = true 
-            ORDER BY published_at DESC
-        """, (post_id,))
-        
+
+        # Keyset pagination on (published_at, id): every page is a range scan of
+        # idx_webmentions_post_published, however deep the reader pages
+        if cursor:
+            cur.execute("""
+                SELECT * FROM webmentions
+                WHERE post_id = %s AND verified = true AND (published_at, id) < (%s, %s)
+                ORDER BY published_at DESC, id DESC
+                LIMIT %s
+            """, (post_id, published_at, last_id, limit + 1))
+        else:
+            cur.execute("""
+                SELECT * FROM webmentions
+                WHERE post_id = %s AND verified = true
+                ORDER BY published_at DESC, id DESC
+                LIMIT %s
+            """, (post_id, limit + 1))
+
         webmentions = [dict(mention) for mention in cur.fetchall()]
-        return jsonify(webmentions)
-        
+        response = jsonify(webmentions[:limit])
+        if len(webmentions) > limit:
+            last = webmentions[limit - 1]
+            next_cursor = f"{last['published_at'].isoformat()},{last['id']}"
+            response.headers['Link'] = f'<{request.base_url}?limit={limit}&before={quote(next_cursor)}>; rel="next"'
+        return response
+
     except Exception as e:
         print(f"Error fetching webmentions: {e}")
         return jsonify({"message": "Error fetching webmentions"}), 500
     finally:
         if conn: conn.close()
 
+# ====================================================================
+# --- Syndication Feeds ---
+# ====================================================================
+# Atom feeds for the whole site, a category or a tag, built from the newest FEED_SIZE posts.
+# Each feed is serialized once and cached as bytes together with its ETag. The cache key holds
+# the feed's scope generation (feed_site, feed_category_<slug>, feed_tag_<name>), which post
+# writes bump after they commit. Polling readers get a 304 after a single cache lookup.
+FEED_SIZE = int(os.getenv('FEED_SIZE', '20'))
+FEED_TITLE = os.getenv('FEED_TITLE', 'Chyrp Lite')
+FEED_MAX_AGE = 300  # Seconds readers may reuse a feed before revalidating
+FEED_CACHE_SECONDS = 86400  # Generations already retire stale feeds; this just bounds memory
+
+def feed_scopes(cur, post_id):
+    """Generation names of every feed the post currently appears in"""
+    cur.execute("""
+        SELECT cat.slug,
+            ARRAY(SELECT t.name FROM post_tags pt JOIN tags t ON t.id = pt.tag_id WHERE pt.post_id = p.id)
+        FROM posts p
+        LEFT JOIN categories cat ON cat.id = p.category_id
+        WHERE p.id = %s
+    """, (post_id,))
+    row = cur.fetchone()
+    scopes = {'feed_site'}
+    if row:
+        if row[0]:
+            scopes.add(f'feed_category_{row[0]}')
+        scopes.update(f'feed_tag_{name}' for name in row[1])
+    return scopes
+
+def invalidate_feeds(scopes):
+    """Starts new generations for the given feeds; call after the write has committed"""
+    for scope in scopes:
+        cache.delete(scope)
+
+def _xml_attr(value):
+    return xml_escape(value, {'"': '&quot;'})
+
+def _atom_time(value):
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)  # Naive timestamps are stored in UTC
+    return value.isoformat()
+
+def _atom_entry(post, site_url):
+    post_url = f"{site_url}/posts/{post['id']}"
+    content_html, excerpt = post['content_html'], post['excerpt']
+    if content_html is None and post['content']:
+        content_html, excerpt = render_content(post['content'])  # Not backfilled yet (flask render-posts)
+    title = post['title'] or excerpt or f"{post['type'].capitalize()} post"
+
+    entry = ['  <entry>\n']
+    entry.append(f"    <title>{xml_escape(title)}</title>\n")
+    entry.append(f"    <id>{xml_escape(post_url)}</id>\n")
+    entry.append(f'    <link rel="alternate" type="text/html" href="{_xml_attr(post_url)}"/>\n')
+    if post['link_url']:
+        entry.append(f'    <link rel="related" href="{_xml_attr(post["link_url"])}"/>\n')
+    if post['image_url']:
+        entry.append(f'    <link rel="enclosure" href="{_xml_attr(post["image_url"])}"/>\n')
+    entry.append(f"    <published>{_atom_time(post['created_at'])}</published>\n")
+    entry.append(f"    <updated>{_atom_time(post['updated_at'] or post['created_at'])}</updated>\n")
+    entry.append(f"    <author><name>{xml_escape(post['username'])}</name></author>\n")
+    if post['category_name']:
+        entry.append(f'    <category term="{_xml_attr(post["category_slug"])}" label="{_xml_attr(post["category_name"])}"/>\n')
+    for tag in post['tags']:
+        entry.append(f'    <category term="{_xml_attr(tag)}"/>\n')
+    if excerpt:
+        entry.append(f"    <summary>{xml_escape(excerpt)}</summary>\n")
+    if content_html:
+        entry.append(f'    <content type="html">{xml_escape(content_html)}</content>\n')
+    entry.append('  </entry>\n')
+    return ''.join(entry)
+
+def build_atom_feed(cur, title, page_url, where_sql='', params=()):
+    """Serializes the newest FEED_SIZE matching posts. Returns (bytes, last updated)."""
+    cur.execute(f"""
+        SELECT p.id, p.type, p.title, p.content, p.content_html, p.excerpt, p.link_url, p.image_url,
+            p.created_at, p.updated_at, u.username, cat.name AS category_name, cat.slug AS category_slug,
+            ARRAY(SELECT t.name FROM post_tags pt JOIN tags t ON t.id = pt.tag_id WHERE pt.post_id = p.id) AS tags
+        FROM posts p
+        JOIN users u ON u.id = p.user_id
+        LEFT JOIN categories cat ON cat.id = p.category_id
+        {where_sql}
+        ORDER BY p.created_at DESC
+        LIMIT %s
+    """, (*params, FEED_SIZE))
+    posts = cur.fetchall()
+    site_url = os.getenv("FRONTEND_URL", "http://localhost:5173")
+    updated = max((post['updated_at'] or post['created_at'] for post in posts), default=None)
+    updated = updated.replace(tzinfo=updated.tzinfo or timezone.utc) if updated else datetime.now(timezone.utc)
+
+    feed = ['<?xml version="1.0" encoding="utf-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">\n']
+    feed.append(f"  <title>{xml_escape(title)}</title>\n")
+    feed.append(f"  <id>{xml_escape(request.base_url)}</id>\n")
+    feed.append(f'  <link rel="self" type="application/atom+xml" href="{_xml_attr(request.base_url)}"/>\n')
+    feed.append(f'  <link rel="alternate" type="text/html" href="{_xml_attr(site_url + page_url)}"/>\n')
+    feed.append(f"  <updated>{_atom_time(updated)}</updated>\n")
+    feed.extend(_atom_entry(post, site_url) for post in posts)
+    feed.append('</feed>\n')
+    return ''.join(feed).encode('utf-8'), updated
+
+def serve_feed(scope, build):
+    """Returns the cached feed for scope (building it with build(cur) on a miss) as a conditional response"""
+    cache_key = f"feed_{cache_generation('feeds')}_{scope}_{cache_generation(scope)}"
+    cached = cache.get(cache_key)
+    if cached is None:
+        conn = None
+        try:
+            # The primary, not a replica: a feed built from a lagging replica would be cached for
+            # the whole generation. Rebuilds happen once per generation, so this is cheap.
+            conn = get_db_connection()
+            cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
+            built = build(cur)
+            if built is None:
+                return jsonify({"message": "Feed not found"}), 404
+            body, updated = built
+            cached = (body, hashlib.md5(body).hexdigest(), updated)
+            cache.set(cache_key, cached, timeout=FEED_CACHE_SECONDS)
+        except (Exception, psycopg2.DatabaseError) as error:
+            print(f"DATABASE ERROR building feed {scope}: {error}")
+            return jsonify({'message': 'Could not generate feed'}), 500
+        finally:
+            if conn: conn.close()
+
+    body, etag, updated = cached
+    response = Response(body, mimetype='application/atom+xml')
+    response.set_etag(etag)
+    response.last_modified = updated
+    response.cache_control.public = True
+    response.cache_control.max_age = FEED_MAX_AGE
+    return response.make_conditional(request)
+
+@app.route('/feed.atom', methods=['GET'])
+def site_feed():
+    """Atom feed of the newest posts on the site."""
+    return serve_feed('feed_site', lambda cur: build_atom_feed(cur, FEED_TITLE, ''))
+
+@app.route('/posts/category/<category_slug>/feed.atom', methods=['GET'])
+def category_feed(category_slug):
+    """Atom feed of the newest posts in one category."""
+    def build(cur):
+        execute_prepared(cur, 'category_by_slug', (category_slug,))
+        category = cur.fetchone()
+        if not category:
+            return None
+        return build_atom_feed(cur, f"{FEED_TITLE}: {category['name']}", f"/category/{category_slug}",
+                               "WHERE cat.slug = %s", (category_slug,))
+    return serve_feed(f'feed_category_{category_slug}', build)
+
+@app.route('/posts/tag/<tag_name>/feed.atom', methods=['GET'])
+def tag_feed(tag_name):
+    """Atom feed of the newest posts with one tag."""
+    def build(cur):
+        cur.execute("SELECT id FROM tags WHERE name = %s", (tag_name,))
+        tag = cur.fetchone()
+        if not tag:
+            return None
+        return build_atom_feed(cur, f"{FEED_TITLE}: #{tag_name}", f"/tag/{quote(tag_name)}",
+                               "WHERE p.id IN (SELECT post_id FROM post_tags WHERE tag_id = %s)", (tag['id'],))
+    return serve_feed(f'feed_tag_{tag_name}', build)
+
 # ====================================================================
 # --- Sitemap Endpoint ---
 # ====================================================================
@@ -886,7 +2482,7 @@ def sitemap():
 
     conn = None
     try:
-        conn = get_db_connection()
+        conn = get_db_connection(readonly=True)
         cur = conn.cursor(cursor_factory=psycopg2.extras.DictCursor)
 
         static_urls = [{'loc': base_url, 'lastmod': datetime.now().strftime('%Y-%m-%d')}]
@@ -0,0 +1,38 @@
+"""
+Async serving mode: the same Flask app and routes, run on gevent instead of one OS thread per request.
+
+Every blocking call becomes a cooperative one. psycopg2 waits on libpq's non-blocking socket through
+psycogreen, the connection pool and its semaphore queue as greenlets, and boto3/S3 and HTTP
+sockets are monkey-patched. A single process can therefore hold thousands of slow clients open
+while only DB_POOL_MAX of them hold a database connection at any moment.
+
+Production (gunicorn's gevent worker monkey-patches before loading this module):
+    gunicorn -k gevent --worker-connections 4000 -w 4 async_app:app
+Local:
+    python async_app.py
+"""
+from gevent import monkey
+monkey.patch_all()
+
+from gevent import get_hub
+from psycogreen.gevent import patch_psycopg
+patch_psycopg()  # Must run before the first connection is opened
+
+import os
+
+import app as blog
+
+app = blog.app
+
+# bcrypt is deliberately slow CPU work and would stall every greenlet in the process,
+# so hashing runs on gevent's native thread pool (bcrypt releases the GIL while it works).
+_check_password_hash = blog.bcrypt.check_password_hash
+_generate_password_hash = blog.bcrypt.generate_password_hash
+blog.bcrypt.check_password_hash = lambda *args: get_hub().threadpool.apply(_check_password_hash, args)
+blog.bcrypt.generate_password_hash = lambda *args: get_hub().threadpool.apply(_generate_password_hash, args)
+
+if __name__ == '__main__':
+    from gevent.pywsgi import WSGIServer
+    port = int(os.getenv('PORT', '5000'))
+    print(f"Serving on http://localhost:{port} (gevent)")
+    WSGIServer(('0.0.0.0', port), app).serve_forever()
@@ -0,0 +1 @@
+"""Load-test and benchmark suite for the Chyrp backend (see bench/README.md)."""
@@ -0,0 +1,59 @@
+"""
+Compares two benchmark result files written by bench.run.
+
+Usage (from the backend/ directory):
+    python -m bench.compare bench/results/<before>.json bench/results/<after>.json
+"""
+import argparse
+import json
+
+METRICS = [
+    ('req/s', lambda s: s['throughput_rps'], True),
+    ('p50', lambda s: s['latency_ms']['p50'], False),
+    ('p95', lambda s: s['latency_ms']['p95'], False),
+    ('p99', lambda s: s['latency_ms']['p99'], False),
+    ('queries', lambda s: s['queries_mean'], False),
+]
+
+
+def change(before, after, higher_is_better):
+    """Percent change, signed so that positive always means 'better'"""
+    if before in (None, 0) or after is None:
+        return None
+    delta = (after - before) / before * 100
+    return delta if higher_is_better else -delta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    args = parser.parse_args()
+
+    with open(args.before, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(args.after, encoding='utf-8') as f:
+        after = json.load(f)
+
+    if before['meta']['dataset'] != after['meta']['dataset']:
+        print("WARNING: runs used different datasets; numbers are not directly comparable")
+    print(f"{before['meta']['label']} ({before['meta']['git_revision']}) -> "
+          f"{after['meta']['label']} ({after['meta']['git_revision']}); positive % = better\n")
+
+    header = f"{'scenario':<16}" + ''.join(f"{name:>22}" for name, _, _ in METRICS)
+    print(header)
+    for scenario in sorted(set(before['scenarios']) & set(after['scenarios'])):
+        b, a = before['scenarios'][scenario], after['scenarios'][scenario]
+        cells = []
+        for _, metric, higher_is_better in METRICS:
+            old, new = metric(b), metric(a)
+            pct = change(old, new, higher_is_better)
+            old_s = f"{old:.1f}" if old is not None else '-'
+            new_s = f"{new:.1f}" if new is not None else '-'
+            pct_s = f"{pct:+.0f}%" if pct is not None else ''
+            cells.append(f"{old_s + '->' + new_s + ' ' + pct_s:>22}")
+        print(f"{scenario:<16}" + ''.join(cells))
+
+
+if __name__ == '__main__':
+    main()
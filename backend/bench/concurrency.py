@@ -0,0 +1,182 @@
+"""
+Compares the sync worker model against the async (gevent) serving mode under many slow clients.
+
+For each mode it starts gunicorn on a local port and opens --slow-clients connections that
+trickle request headers (one header every few seconds, never finishing the request), the way
+slow mobile clients or idle keep-alive sockets behave. While those are held open it runs the
+normal bench.run scenarios and records latency and throughput. Sync workers are pinned by
+each slow socket, so their numbers collapse once slow clients outnumber workers x threads.
+The gevent worker parks them as greenlets.
+
+Usage (from the backend/ directory, database seeded with bench.seed):
+    python -m bench.concurrency
+    python -m bench.concurrency --mode sync --mode gevent --slow-clients 2000 --scenario post_detail
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+from bench.run import RESULTS_DIR, SCENARIOS, Client, git_revision, load_dataset, run_scenario
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# name -> gunicorn arguments; {workers}/{threads}/{connections} come from the command line
+MODES = {
+    'sync': ['-k', 'sync', '-w', '{workers}', 'app:app'],
+    'gthread': ['-k', 'gthread', '-w', '{workers}', '--threads', '{threads}', 'app:app'],
+    'gevent': ['-k', 'gevent', '-w', '{workers}', '--worker-connections', '{connections}', 'async_app:app'],
+}
+
+
+class SlowClients:
+    """Holds many connections open, each sending one more header line every interval seconds"""
+
+    def __init__(self, host, port, count, interval):
+        self._host, self._port, self._count, self._interval = host, port, count, interval
+        self._sockets = []
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._trickle, daemon=True)
+        self.failed = 0
+
+    def start(self):
+        for _ in range(self._count):
+            try:
+                sock = socket.create_connection((self._host, self._port), timeout=5)
+                sock.sendall(b"GET /categories HTTP/1.1\r\nHost: bench\r\n")
+                self._sockets.append(sock)
+            except OSError:
+                self.failed += 1
+        self._thread.start()
+
+    def _trickle(self):
+        while not self._stop.wait(self._interval):
+            for sock in list(self._sockets):
+                try:
+                    sock.sendall(b"X-Slow: 1\r\n")
+                except OSError:  # The server gave up on this client
+                    self._sockets.remove(sock)
+                    self.failed += 1
+
+    @property
+    def open(self):
+        return len(self._sockets)
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        for sock in self._sockets:
+            sock.close()
+
+
+def start_server(mode, args):
+    substitutions = {'workers': args.workers, 'threads': args.threads, 'connections': args.worker_connections}
+    command = [sys.executable, '-m', 'gunicorn', '-b', f"127.0.0.1:{args.port}", '--timeout', '120',
+               '--backlog', str(args.slow_clients + 1024)]
+    command += [part.format(**substitutions) for part in MODES[mode]]
+    env = dict(os.environ, RUN_BACKGROUND_JOBS='0')  # Keep background refreshes out of the measurement
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    client = Client(f"http://127.0.0.1:{args.port}")
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if client.request('GET', '/categories')[0] == 200:
+                return server
+        except Exception:  # Not listening yet
+            pass
+        time.sleep(0.5)
+    server.terminate()
+    raise RuntimeError(f"gunicorn ({mode}) did not become ready on port {args.port}")
+
+
+def stop_server(server):
+    server.terminate()
+    try:
+        server.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        server.kill()
+
+
+def raise_file_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and gevent workers while many slow clients are connected.")
+    parser.add_argument('--mode', action='append', choices=sorted(MODES), help="Worker model (repeatable); defaults to all")
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS), help="bench.run scenario (repeatable)")
+    parser.add_argument('--slow-clients', type=int, default=1000)
+    parser.add_argument('--slow-interval', type=float, default=5.0, help="Seconds between trickled header lines")
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=8, help="Threads per gthread worker")
+    parser.add_argument('--worker-connections', type=int, default=4000, help="Greenlets per gevent worker")
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--duration', type=float, default=20.0)
+    parser.add_argument('--warmup', type=float, default=3.0)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seed', type=int, default=2025)
+    args = parser.parse_args()
+    args.base_url = f"http://127.0.0.1:{args.port}"
+
+    file_limit = raise_file_limit()
+    if args.slow_clients + 256 > file_limit:
+        print(f"Warning: open-file limit is {file_limit}; some slow clients will fail to connect")
+
+    ds = load_dataset()
+    modes = args.mode or list(MODES)
+    scenarios = args.scenario or ['post_detail', 'feed_paging', 'like_toggle']
+    result = {
+        'meta': {
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'slow_clients': args.slow_clients,
+            'slow_interval_s': args.slow_interval,
+            'workers': args.workers,
+            'threads': args.threads,
+            'worker_connections': args.worker_connections,
+            'duration_s': args.duration,
+            'concurrency': args.concurrency,
+        },
+        'modes': {},
+    }
+
+    print(f"{'mode':<8} {'scenario':<14} {'req/s':>9} {'p50':>8} {'p99':>8} {'errors':>7} {'slow open':>10}")
+    for mode in modes:
+        server = start_server(mode, args)
+        slow = SlowClients('127.0.0.1', args.port, args.slow_clients, args.slow_interval)
+        try:
+            slow.start()
+            mode_result = {}
+            for name in scenarios:
+                stats = run_scenario(name, args, ds)
+                stats['slow_clients_open'] = slow.open
+                mode_result[name] = stats
+                lat = stats['latency_ms']
+                fmt = lambda v: f"{v:8.1f}" if v is not None else f"{'-':>8}"
+                print(f"{mode:<8} {name:<14} {stats['throughput_rps']:9.1f} {fmt(lat['p50'])} {fmt(lat['p99'])} "
+                      f"{sum(stats['errors'].values()):7d} {slow.open:10d}")
+            result['modes'][mode] = {'scenarios': mode_result, 'slow_clients_failed': slow.failed}
+        finally:
+            slow.stop()
+            stop_server(server)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    path = os.path.join(RESULTS_DIR, f"{stamp}-concurrency.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+Measures the per-user liked-set cache used to fill liked_by_user on feed pages.
+
+Reports, for sets of increasing size:
+  - memory footprint of the cached value (sorted uint32 array) vs an equivalent Python set
+  - time to decode the cached bytes and fill liked_by_user for one feed page
+and, when a database is reachable (--dsn), compares the feed query with the old
+per-row EXISTS subquery against the shared query plus loading a user's set.
+
+Usage (from the backend/ directory):
+    python -m bench.liked_set
+    python -m bench.liked_set --dsn "host=localhost dbname=blog user=p1 password=root"
+"""
+import argparse
+import bisect
+import json
+import os
+import pickle
+import random
+import sys
+import time
+from array import array
+from datetime import datetime, timezone
+
+from bench.run import RESULTS_DIR
+
+SIZES = [10, 100, 1_000, 10_000, 100_000]
+PAGE_SIZE = 20
+
+FEED_SQL = """
+    SELECT p.id, COALESCE(lc.like_count, 0) AS like_count{liked_column}
+    FROM posts p
+    LEFT JOIN (SELECT post_id, COUNT(*) AS like_count FROM post_likes GROUP BY post_id) lc ON p.id = lc.post_id
+    ORDER BY p.created_at DESC
+    LIMIT %s OFFSET %s
+"""
+EXISTS_COLUMN = ", EXISTS(SELECT 1 FROM post_likes WHERE post_id = p.id AND user_id = %s) AS liked_by_user"
+
+
+def best_of(func, repeat=5, number=200):
+    """Best average wall time of func() in microseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best * 1e6
+
+
+def fill(liked, page_ids):
+    """Same membership test as app.fill_liked_by_user"""
+    flags = []
+    for post_id in page_ids:
+        index = bisect.bisect_left(liked, post_id)
+        flags.append(index < len(liked) and liked[index] == post_id)
+    return flags
+
+
+def measure_in_memory(rng):
+    rows = []
+    for size in SIZES:
+        ids = sorted(rng.sample(range(1, 2_000_000), size))
+        liked = array('I', ids)
+        cached = liked.tobytes()
+        as_set = set(ids)
+        page_ids = rng.sample(ids, min(PAGE_SIZE // 2, size)) + rng.sample(range(1, 2_000_000), PAGE_SIZE // 2)
+
+        def decode_and_fill():
+            decoded = array('I')
+            decoded.frombytes(cached)
+            fill(decoded, page_ids)
+
+        rows.append({
+            'likes': size,
+            'cached_bytes': len(cached),
+            'pickled_bytes': len(pickle.dumps(cached)),
+            'python_set_bytes': sys.getsizeof(as_set) + sum(sys.getsizeof(i) for i in ids),
+            'decode_and_fill_page_us': round(best_of(decode_and_fill), 2),
+        })
+    return rows
+
+
+def measure_database(dsn, rng):
+    import psycopg2
+
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("SELECT user_id, COUNT(*) FROM post_likes GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1")
+    row = cur.fetchone()
+    if not row:
+        return None
+    user_id, like_count = row
+
+    def timed(sql, params, runs=20):
+        samples = []
+        for _ in range(runs):
+            started = time.perf_counter()
+            cur.execute(sql, params)
+            cur.fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+        return round(sorted(samples)[len(samples) // 2], 3)  # median ms
+
+    offset = rng.randint(0, 100) * PAGE_SIZE
+    with_exists = FEED_SQL.format(liked_column=EXISTS_COLUMN)
+    shared = FEED_SQL.format(liked_column='')
+    result = {
+        'user_id': user_id,
+        'user_likes': like_count,
+        'feed_with_exists_ms': timed(with_exists, (user_id, PAGE_SIZE, offset)),
+        'feed_shared_ms': timed(shared, (PAGE_SIZE, offset)),
+        'load_liked_set_ms': timed("SELECT post_id FROM post_likes WHERE user_id = %s ORDER BY post_id", (user_id,)),
+    }
+    conn.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure liked-set memory footprint and latency.")
+    parser.add_argument('--dsn', help="Also compare against the EXISTS feed query on this database")
+    parser.add_argument('--seed', type=int, default=2025)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    in_memory = measure_in_memory(rng)
+    print(f"{'likes':>8} {'cached B':>10} {'pickled B':>10} {'py set B':>11} {'fill page us':>13}")
+    for row in in_memory:
+        print(f"{row['likes']:>8} {row['cached_bytes']:>10} {row['pickled_bytes']:>10} "
+              f"{row['python_set_bytes']:>11} {row['decode_and_fill_page_us']:>13}")
+
+    database = measure_database(args.dsn, rng) if args.dsn else None
+    if database:
+        print(f"\nHeaviest liker (user {database['user_id']}, {database['user_likes']} likes), median ms:")
+        print(f"  feed page with per-row EXISTS: {database['feed_with_exists_ms']}")
+        print(f"  shared feed page:              {database['feed_shared_ms']}")
+        print(f"  load liked set (cache miss):   {database['load_liked_set_ms']}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    path = os.path.join(RESULTS_DIR, f"{stamp}-liked-set.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'in_memory': in_memory, 'database': database}, f, indent=2)
+    print(f"Results written to {path}")
+
+
+if __name__ == '__main__':
+    main()
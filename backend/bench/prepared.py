@@ -0,0 +1,141 @@
+"""
+Measures what the prepared-statement registry saves on the hot feed/detail queries.
+
+For every statement in app.PREPARED_STATEMENTS it runs the same parameters three ways
+on one connection:
+  - text:    the SQL sent as a string every time (parsed, analysed and planned per call)
+  - custom:  EXECUTE with plan_cache_mode=force_custom_plan (parse skipped, planned per call)
+  - generic: EXECUTE with plan_cache_mode=force_generic_plan (parse and plan skipped)
+and reports the median round trip plus the server-side planning time from
+EXPLAIN (ANALYZE, SUMMARY). Needs PostgreSQL 12+ for plan_cache_mode.
+
+Usage (from the backend/ directory, ideally after bench.seed):
+    python -m bench.prepared
+    python -m bench.prepared --dsn "host=localhost dbname=blog user=p1 password=root" --runs 50
+"""
+import argparse
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import psycopg2
+
+from app import PREPARED_STATEMENTS, as_text_query
+from bench.run import RESULTS_DIR
+from bench.seed import DEFAULT_DSN
+
+
+def sample_params(cur):
+    """One realistic parameter set per registered statement, taken from the current data"""
+    cur.execute("SELECT id FROM posts ORDER BY created_at DESC LIMIT 1")
+    post_id = cur.fetchone()[0]
+    cur.execute("SELECT t.name FROM tags t JOIN post_tags pt ON pt.tag_id = t.id GROUP BY t.name ORDER BY COUNT(*) DESC LIMIT 1")
+    tag = cur.fetchone()[0]
+    cur.execute("SELECT slug FROM categories ORDER BY id LIMIT 1")
+    slug = cur.fetchone()[0]
+    return {
+        'feed_count': (),
+        'feed_count_by_tag': (f"%{tag}%",),
+        'feed_page': (5, 0),
+        'feed_page_by_tag': (f"%{tag}%", 5, 0),
+        'post_detail': (post_id,),
+        'post_tags': (post_id,),
+        'post_media': (post_id,),
+        'tag_posts': (tag,),
+        'category_by_slug': (slug,),
+        'category_posts': (slug,),
+    }
+
+
+def execute_sql(name, params):
+    """(sql, params) for an EXECUTE of a registered statement"""
+    if not params:
+        return f"EXECUTE {name}", None
+    return f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", tuple(params)
+
+
+def median_ms(cur, sql, params, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        cur.execute(sql, params)
+        cur.fetchall()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(sorted(samples)[len(samples) // 2], 3)
+
+
+def planning_ms(cur, sql, params, runs):
+    """Median 'Planning Time' the server reports for the statement"""
+    samples = []
+    for _ in range(runs):
+        cur.execute(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {sql}", params)
+        samples.append(cur.fetchone()[0][0]['Planning Time'])
+    return round(sorted(samples)[len(samples) // 2], 3)
+
+
+def measure(dsn, runs):
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    params_by_name = sample_params(cur)
+    for name, (param_types, sql) in PREPARED_STATEMENTS.items():
+        signature = f" ({', '.join(param_types)})" if param_types else ""
+        cur.execute(f"PREPARE {name}{signature} AS {sql}")
+
+    rows = []
+    for name, params in params_by_name.items():
+        text_sql = as_text_query(name)
+        text_params = {f'p{i}': value for i, value in enumerate(params, 1)}
+        prepared_sql, prepared_params = execute_sql(name, params)
+        row = {'statement': name}
+        row['text_ms'] = median_ms(cur, text_sql, text_params, runs)
+        row['text_planning_ms'] = planning_ms(cur, text_sql, text_params, runs)
+        for mode in ('custom', 'generic'):
+            cur.execute(f"SET plan_cache_mode = force_{mode}_plan")
+            row[f'{mode}_ms'] = median_ms(cur, prepared_sql, prepared_params, runs)
+            row[f'{mode}_planning_ms'] = planning_ms(cur, prepared_sql, prepared_params, runs)
+        cur.execute("RESET plan_cache_mode")
+        rows.append(row)
+    conn.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare text SQL against prepared EXECUTE for the hot queries.")
+    parser.add_argument('--dsn', default=DEFAULT_DSN)
+    parser.add_argument('--runs', type=int, default=30, help="Executions per statement and mode")
+    args = parser.parse_args()
+
+    rows = measure(args.dsn, args.runs)
+    print(f"{'statement':<18} {'text':>8} {'custom':>8} {'generic':>8}   "
+          f"{'plan text':>9} {'plan cust':>9} {'plan gen':>9}  (median ms)")
+    for row in rows:
+        print(f"{row['statement']:<18} {row['text_ms']:8.3f} {row['custom_ms']:8.3f} {row['generic_ms']:8.3f}   "
+              f"{row['text_planning_ms']:9.3f} {row['custom_planning_ms']:9.3f} {row['generic_planning_ms']:9.3f}")
+    # Per request: get_posts runs a count and a page, get_post runs detail, tags and media
+    per_request = {
+        'feed_page': ('feed_count', 'feed_page'),
+        'post_detail': ('post_detail', 'post_tags', 'post_media'),
+    }
+    by_name = {row['statement']: row for row in rows}
+    saved = {
+        request: {
+            mode: round(sum(by_name[n]['text_ms'] - by_name[n][f'{mode}_ms'] for n in names), 3)
+            for mode in ('custom', 'generic')
+        }
+        for request, names in per_request.items()
+    }
+    for request, modes in saved.items():
+        print(f"Saved per {request} request: custom {modes['custom']} ms, generic {modes['generic']} ms")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    path = os.path.join(RESULTS_DIR, f"{stamp}-prepared.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'runs': args.runs, 'statements': rows, 'saved_per_request_ms': saved}, f, indent=2)
+    print(f"Results written to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""
+Runs scripted load scenarios against a running backend and stores the results as JSON.
+
+Each scenario hammers one route with a closed loop of worker threads (keep-alive
+connections, one per worker) for a fixed duration and reports p50/p95/p99
+latency, throughput, and the DB time / query count the server reports in its
+Server-Timing header. Request parameters are drawn from a seeded RNG and the
+dataset manifest written by bench.seed, so two runs issue the same workload.
+
+Usage (from the backend/ directory, with the API running):
+    python -m bench.run                                   # every scenario, 30s each
+    python -m bench.run --scenario feed_paging --scenario post_detail --duration 10 --label baseline
+"""
+import argparse
+import bisect
+import http.client
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+
+from bench.seed import MANIFEST_FILE, zipf_cum_weights
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+_SERVER_TIMING_RE = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+# --- Scenarios ---
+# Each scenario takes (rng, dataset) and returns (method, path, json_body).
+
+def _hot_post_id(rng, ds):
+    """Newest posts are the hottest: Zipf rank 1 is the most recent post"""
+    first, last = ds['post_id_range']
+    rank = bisect.bisect_left(ds['_post_cum'], rng.random() * ds['_post_cum'][-1])
+    return max(first, last - rank)
+
+def _hot_tag(rng, ds):
+    return ds['tags'][bisect.bisect_left(ds['_tag_cum'], rng.random() * ds['_tag_cum'][-1])]
+
+def feed_paging(rng, ds):
+    return 'GET', f"/posts?page={rng.randint(1, 20)}&per_page=5", None
+
+def tag_browse(rng, ds):
+    return 'GET', f"/posts/tag/{quote(_hot_tag(rng, ds))}", None
+
+def category_browse(rng, ds):
+    return 'GET', f"/posts/category/{rng.choice(ds['category_slugs'])}", None
+
+def post_detail(rng, ds):
+    return 'GET', f"/posts/{_hot_post_id(rng, ds)}", None
+
+def post_batch(rng, ds):
+    ids = ','.join(str(_hot_post_id(rng, ds)) for _ in range(10))
+    return 'GET', f"/posts/batch?ids={ids}", None
+
+def like_toggle(rng, ds):
+    return 'POST', f"/posts/{_hot_post_id(rng, ds)}/like", None
+
+def comment_write(rng, ds):
+    return 'POST', f"/posts/{_hot_post_id(rng, ds)}/comments", {'content': f"bench comment {rng.random():.6f}"}
+
+def popular_feed(rng, ds):
+    return 'GET', f"/posts/popular?page={rng.randint(1, 10)}", None
+
+def sitemap(rng, ds):
+    return 'GET', "/sitemap.xml", None
+
+# name -> (request builder, needs a logged-in user)
+SCENARIOS = {
+    'feed_paging': (feed_paging, False),
+    'tag_browse': (tag_browse, False),
+    'category_browse': (category_browse, False),
+    'post_detail': (post_detail, False),
+    'post_batch': (post_batch, False),
+    'like_toggle': (like_toggle, True),
+    'comment_write': (comment_write, True),
+    'popular_feed': (popular_feed, False),
+    'sitemap': (sitemap, False),
+}
+
+
+class Client:
+    """One keep-alive HTTP connection per worker thread"""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self._host, self._port = parts.hostname, parts.port or 80
+        self._conn = None
+        self.token = None
+
+    def request(self, method, path, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        payload = json.dumps(body) if body is not None else None
+        for attempt in (1, 2):
+            if self._conn is None:
+                self._conn = http.client.HTTPConnection(self._host, self._port, timeout=30)
+            try:
+                self._conn.request(method, path, body=payload, headers=headers)
+                response = self._conn.getresponse()
+                data = response.read()
+                return response.status, response.getheader('Server-Timing', ''), data
+            except (http.client.HTTPException, OSError):
+                self._conn.close()
+                self._conn = None
+                if attempt == 2:
+                    raise
+
+    def login(self, username, password):
+        status, _, data = self.request('POST', '/login', {'username': username, 'password': password})
+        if status != 200:
+            raise RuntimeError(f"Login failed for {username}: HTTP {status}")
+        self.token = json.loads(data)['access_token']
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(pct / 100.0 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def run_scenario(name, args, ds):
+    builder, needs_auth = SCENARIOS[name]
+    samples, statuses, errors = [], Counter(), Counter()
+    lock = threading.Lock()
+    start_at = time.perf_counter() + args.warmup
+    stop_at = start_at + args.duration
+
+    def worker(index):
+        rng = random.Random(f"{args.seed}-{name}-{index}")
+        client = Client(args.base_url)
+        if needs_auth:
+            user_index = rng.randint(1, ds['users'])
+            try:
+                client.login(ds['username_pattern'].format(user_index), ds['password'])
+            except Exception as e:
+                with lock:
+                    errors[f"login: {e}"] += 1
+                return
+        local_samples, local_statuses, local_errors = [], Counter(), Counter()
+        while True:
+            now = time.perf_counter()
+            if now >= stop_at:
+                break
+            method, path, body = builder(rng, ds)
+            try:
+                status, server_timing, _ = client.request(method, path, body)
+            except Exception as e:
+                local_errors[type(e).__name__] += 1
+                continue
+            elapsed_ms = (time.perf_counter() - now) * 1000
+            if now < start_at:
+                continue  # Warm-up traffic primes caches and connections but is not recorded
+            local_statuses[status] += 1
+            match = _SERVER_TIMING_RE.search(server_timing)
+            db_ms, queries = (float(match.group(1)), int(match.group(2))) if match else (None, None)
+            local_samples.append((elapsed_ms, db_ms, queries))
+        with lock:
+            samples.extend(local_samples)
+            statuses.update(local_statuses)
+            errors.update(local_errors)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies = sorted(s[0] for s in samples)
+    db_samples = [s for s in samples if s[1] is not None]
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / args.duration, 2),
+        'latency_ms': {
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            'max': latencies[-1] if latencies else None,
+        },
+        'db_ms_mean': sum(s[1] for s in db_samples) / len(db_samples) if db_samples else None,
+        'queries_mean': sum(s[2] for s in db_samples) / len(db_samples) if db_samples else None,
+        'status_counts': {str(k): v for k, v in sorted(statuses.items())},
+        'errors': dict(errors),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except Exception:
+        return None
+
+
+def load_dataset():
+    with open(MANIFEST_FILE, encoding='utf-8') as f:
+        ds = json.load(f)
+    first, last = ds['post_id_range']
+    ds['_post_cum'] = zipf_cum_weights(min(last - first + 1, 100_000), s=0.9)
+    ds['_tag_cum'] = zipf_cum_weights(len(ds['tags']))
+    return ds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run benchmark scenarios against a running backend.")
+    parser.add_argument('--base-url', default=os.getenv('BENCH_BASE_URL', 'http://localhost:5000'))
+    parser.add_argument('--scenario', action='append', choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable); defaults to all")
+    parser.add_argument('--duration', type=float, default=30.0, help="Measured seconds per scenario")
+    parser.add_argument('--warmup', type=float, default=5.0, help="Unrecorded seconds before measuring")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=2025)
+    parser.add_argument('--label', default='run', help="Tag stored in the result file name")
+    args = parser.parse_args()
+
+    ds = load_dataset()
+    scenarios = args.scenario or list(SCENARIOS)
+    result = {
+        'meta': {
+            'label': args.label,
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'base_url': args.base_url,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'concurrency': args.concurrency,
+            'seed': args.seed,
+            'dataset': {k: ds[k] for k in ('seed', 'users', 'posts', 'generated_at')},
+        },
+        'scenarios': {},
+    }
+
+    print(f"{'scenario':<16} {'req/s':>9} {'p50':>8} {'p95':>8} {'p99':>8} {'db ms':>8} {'queries':>8}")
+    for name in scenarios:
+        stats = run_scenario(name, args, ds)
+        result['scenarios'][name] = stats
+        lat = stats['latency_ms']
+        fmt = lambda v: f"{v:8.1f}" if v is not None else f"{'-':>8}"
+        print(f"{name:<16} {stats['throughput_rps']:9.1f} {fmt(lat['p50'])} {fmt(lat['p95'])} {fmt(lat['p99'])} "
+              f"{fmt(stats['db_ms_mean'])} {fmt(stats['queries_mean'])}")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    path = os.path.join(RESULTS_DIR, f"{stamp}-{args.label}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2)
+    print(f"Results written to {path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,253 @@
+"""
+Seeds a large, reproducible synthetic dataset for benchmarking.
+
+Everything is generated from a single random seed and streamed into Postgres
+with COPY, so the same arguments always produce the same database. Popularity
+(likes, comments, views) is heavy-tailed and tag usage is Zipf-distributed, so
+hot posts and hot tags behave like they would on a real blog.
+
+Usage (from the backend/ directory):
+    python -m bench.seed --reset                      # full size: 100k users, 1M posts
+    python -m bench.seed --reset --users 1000 --posts 10000
+    python -m bench.seed --reset --now 2026-01-01          # replay an earlier run's dataset exactly
+
+Timestamps are laid out backwards from --now, which defaults to today (UTC), so the newest posts
+fall inside the popular-posts window. The popularity ranking is refreshed once seeding finishes.
+"""
+import argparse
+import bisect
+import itertools
+import json
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import bcrypt
+import psycopg2
+import psycopg2.extras
+
+DEFAULT_DSN = os.getenv('BENCH_DSN', 'host=localhost dbname=blog user=p1 password=root')
+MANIFEST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset.json')
+BENCH_PASSWORD = 'benchpass'  # Every seeded user shares this password so scenarios can log in
+
+POST_TYPES = ['text'] * 6 + ['photo'] * 2 + ['quote', 'link', 'video', 'audio']
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore "
+    "et dolore magna aliqua chyrp feather module theme markdown postgres flask react cache index query"
+).split()
+SPAN = timedelta(days=730)  # Seeded content spans the last two years
+
+
+class RowStream:
+    """File-like object that feeds generated rows to copy_expert without building the whole payload in memory"""
+
+    def __init__(self, rows):
+        self._lines = ('\t'.join(_copy_value(v) for v in row) + '\n' for row in rows)
+        self._buffer = ''
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            chunk = ''.join(itertools.islice(self._lines, 1000))
+            if not chunk:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+
+def _copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, datetime):
+        return value.isoformat()
+    text = str(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n')
+
+
+def zipf_cum_weights(n, s=1.1):
+    """Cumulative weights for ranks 1..n under a Zipf(s) distribution"""
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def zipf_sample(rng, cum_weights, k):
+    """Draws k distinct 1-based ranks (fewer if the population is smaller)"""
+    total = cum_weights[-1]
+    k = min(k, len(cum_weights))
+    picked = set()
+    while len(picked) < k:
+        picked.add(bisect.bisect_left(cum_weights, rng.random() * total) + 1)
+    return picked
+
+
+def heavy_tail(rng, mean, cap):
+    """Pareto-distributed count with roughly the given mean, capped at cap"""
+    alpha = 1.5
+    value = int((rng.paretovariate(alpha) - 1) * mean * (alpha - 1))
+    return min(value, cap)
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def copy_rows(cur, table, columns, rows):
+    started = time.perf_counter()
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", RowStream(rows))
+    print(f"  {table}: {cur.rowcount} rows in {time.perf_counter() - started:.1f}s")
+
+
+def reset_tables(cur):
+    cur.execute("""
+        TRUNCATE webmentions, post_view_events, post_views_hourly, post_views_daily, post_likes,
+                 comments, post_media, post_tags, posts, tags, users RESTART IDENTITY CASCADE
+    """)
+    cur.execute("DELETE FROM categories WHERE slug <> 'uncategorized'")
+
+
+def refresh_popular(dsn):
+    """Ranks the seeded posts so the popular_feed scenario has a ranking to page through"""
+    os.environ['DB_PRIMARY_DSN'] = dsn
+    os.environ.setdefault('RUN_BACKGROUND_JOBS', '0')
+    from app import refresh_popular_posts  # Imported late so the app connects to this DSN
+    return refresh_popular_posts(full=True)
+
+
+def utc_date(value):
+    return datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=timezone.utc)
+
+
+def seed(args):
+    rng = random.Random(args.seed)
+    now = args.now  # Same seed and --now give the same rows, timestamps included
+    password_hash = bcrypt.hashpw(BENCH_PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=4)).decode('utf-8')
+
+    conn = psycopg2.connect(args.dsn)
+    cur = conn.cursor()
+    if args.reset:
+        reset_tables(cur)
+
+    print(f"Seeding with seed={args.seed}")
+
+    # --- Users ---
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM users")
+    user_base = cur.fetchone()[0]
+    copy_rows(cur, 'users', ['id', 'username', 'email', 'password_hash', 'created_at'], (
+        (user_base + i, f"bench_user_{i}", f"bench_user_{i}@example.com", password_hash,
+         now - SPAN + timedelta(seconds=i))
+        for i in range(1, args.users + 1)
+    ))
+    cur.execute("SELECT setval('users_id_seq', (SELECT MAX(id) FROM users))")
+
+    # --- Categories ---
+    category_slugs = [f"bench-category-{i}" for i in range(1, args.categories + 1)]
+    psycopg2.extras.execute_values(
+        cur,
+        "INSERT INTO categories (name, slug) VALUES %s ON CONFLICT (slug) DO NOTHING",
+        [(f"Bench Category {i}", slug) for i, slug in enumerate(category_slugs, 1)]
+    )
+    cur.execute("SELECT id FROM categories WHERE slug = ANY(%s) ORDER BY id", (category_slugs,))
+    category_ids = [row[0] for row in cur.fetchall()]
+    category_cum = zipf_cum_weights(len(category_ids), s=0.8)
+
+    # --- Tags ---
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM tags")
+    tag_base = cur.fetchone()[0]
+    tag_names = [f"tag{i}" for i in range(1, args.tags + 1)]
+    copy_rows(cur, 'tags', ['id', 'name'], ((tag_base + i, name) for i, name in enumerate(tag_names, 1)))
+    cur.execute("SELECT setval('tags_id_seq', (SELECT MAX(id) FROM tags))")
+    tag_cum = zipf_cum_weights(args.tags)
+
+    # --- Posts (plus their tags and media) ---
+    cur.execute("SELECT COALESCE(MAX(id), 0) FROM posts")
+    post_base = cur.fetchone()[0]
+    step = SPAN / args.posts
+    post_tags, post_media = [], []
+
+    def post_rows():
+        for i in range(1, args.posts + 1):
+            post_id = post_base + i
+            post_type = rng.choice(POST_TYPES)
+            created_at = now - SPAN + step * i
+            media_url = f"https://example.com/media/{post_id}.jpg" if post_type in ('photo', 'video', 'audio') else None
+            if media_url:
+                post_media.append((post_id, media_url, created_at))
+            for rank in zipf_sample(rng, tag_cum, rng.randint(0, 5)):
+                post_tags.append((post_id, tag_base + rank))
+            category_id = category_ids[bisect.bisect_left(category_cum, rng.random() * category_cum[-1])]
+            yield (
+                post_id, user_base + rng.randint(1, args.users), category_id, post_type,
+                None if post_type == 'quote' else sentence(rng, rng.randint(3, 9)).title(),
+                sentence(rng, rng.randint(20, 200)),
+                f"https://example.com/{post_id}" if post_type == 'link' else None,
+                media_url, heavy_tail(rng, args.views_per_post, args.users), created_at, created_at,
+            )
+
+    copy_rows(cur, 'posts', ['id', 'user_id', 'category_id', 'type', 'title', 'content', 'link_url',
+                             'image_url', 'view_count', 'created_at', 'updated_at'], post_rows())
+    cur.execute("SELECT setval('posts_id_seq', (SELECT MAX(id) FROM posts))")
+    copy_rows(cur, 'post_tags', ['post_id', 'tag_id'], post_tags)
+    copy_rows(cur, 'post_media', ['post_id', 'media_url', 'created_at'], post_media)
+
+    # --- Likes & comments (heavy-tailed per post) ---
+    def like_rows():
+        for post_id in range(post_base + 1, post_base + args.posts + 1):
+            for user_id in rng.sample(range(1, args.users + 1), heavy_tail(rng, args.likes_per_post, args.users)):
+                yield (user_base + user_id, post_id, now - timedelta(seconds=rng.randint(0, 86400 * 30)))
+
+    def comment_rows():
+        for post_id in range(post_base + 1, post_base + args.posts + 1):
+            for _ in range(heavy_tail(rng, args.comments_per_post, 500)):
+                yield (post_id, user_base + rng.randint(1, args.users), sentence(rng, rng.randint(5, 40)),
+                       now - timedelta(seconds=rng.randint(0, 86400 * 30)))
+
+    copy_rows(cur, 'post_likes', ['user_id', 'post_id', 'created_at'], like_rows())
+    copy_rows(cur, 'comments', ['post_id', 'user_id', 'content', 'created_at'], comment_rows())
+
+    conn.commit()
+    conn.autocommit = True
+    cur.execute("ANALYZE")
+    conn.close()
+
+    ranked = refresh_popular(args.dsn)
+    print(f"  post_popularity: {ranked} posts ranked")
+
+    manifest = {
+        'seed': args.seed,
+        'now': now.isoformat(),  # Pass back as --now to reproduce this dataset
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'users': args.users,
+        'posts': args.posts,
+        'user_id_range': [user_base + 1, user_base + args.users],
+        'post_id_range': [post_base + 1, post_base + args.posts],
+        'password': BENCH_PASSWORD,
+        'username_pattern': 'bench_user_{}',
+        'tags': tag_names[:200],  # Hottest tags first (Zipf rank order)
+        'category_slugs': category_slugs,
+    }
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Wrote dataset manifest to {MANIFEST_FILE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a reproducible synthetic benchmark dataset via COPY.")
+    parser.add_argument('--dsn', default=DEFAULT_DSN)
+    parser.add_argument('--seed', type=int, default=2025)
+    parser.add_argument('--now', type=utc_date, default=datetime.now(timezone.utc).strftime('%Y-%m-%d'),
+                        help="Date (YYYY-MM-DD, UTC) the dataset's timestamps count back from; defaults to today")
+    parser.add_argument('--reset', action='store_true', help="Truncate all content tables first")
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--posts', type=int, default=1_000_000)
+    parser.add_argument('--tags', type=int, default=5_000)
+    parser.add_argument('--categories', type=int, default=20)
+    parser.add_argument('--likes-per-post', type=float, default=3.0)
+    parser.add_argument('--comments-per-post', type=float, default=2.0)
+    parser.add_argument('--views-per-post', type=float, default=40.0)
+    seed(parser.parse_args())
+
+
+if __name__ == '__main__':
+    main()
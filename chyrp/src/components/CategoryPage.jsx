@@ -17,7 +17,7 @@ const CategoryPage = ({ categorySlug, setPage, currentUserId, token }) => {
             headers['Authorization'] = `Bearer ${token}`;
         }
 
-        fetch(`${API_URL}/posts/category/${categorySlug}`, { headers })
+        fetch(`${API_URL}/posts/category/${categorySlug}`, { headers, credentials: 'include' })
             .then(res => {
                 if (!res.ok) {
                     if (res.status === 404) return Promise.reject('Category not found.');
@@ -40,6 +40,7 @@ const CategoryPage = ({ categorySlug, setPage, currentUserId, token }) => {
         if (window.confirm("Are you sure you want to delete this post?")) {
             fetch(`${API_URL}/posts/${postId}`, {
                 method: 'DELETE',
+                credentials: 'include',
                 headers: { 'Authorization': `Bearer ${token}` }
             })
             .then(res => res.ok ? res.json() : res.json().then(err => Promise.reject(err)))
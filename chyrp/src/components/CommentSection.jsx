@@ -38,7 +38,7 @@ const CommentSection = ({ postId, token, currentUserId }) => {
 
     // Fetch comments for the post when the component loads
     useEffect(() => {
-        fetch(`${API_URL}/posts/${postId}/comments`)
+        fetch(`${API_URL}/posts/${postId}/comments`, { credentials: 'include' })
             .then(res => res.ok ? res.json() : Promise.reject('Failed to fetch comments.'))
             .then(data => {
                 setComments(data);
@@ -57,6 +57,7 @@ const CommentSection = ({ postId, token, currentUserId }) => {
 
         fetch(`${API_URL}/posts/${postId}/comments`, {
             method: 'POST',
+            credentials: 'include',
             headers: {
                 'Content-Type': 'application/json',
                 'Authorization': `Bearer ${token}`
@@ -27,7 +27,7 @@ const CreatePostPage = ({ token, setPage }) => {
   // --- EFFECTS ---
   useEffect(() => {
     // Fetch categories
-    fetch(`${API_URL}/categories`)
+    fetch(`${API_URL}/categories`, { credentials: 'include' })
       .then(res => res.json())
       .then(data => {
         setCategories(data);
@@ -119,6 +119,7 @@ const CreatePostPage = ({ token, setPage }) => {
           formData.append('file', file);
           return fetch(`${API_URL}/upload`, {
             method: 'POST',
+            credentials: 'include',
             headers: { 'Authorization': `Bearer ${token}` },
             body: formData,
           }).then(res => {
@@ -159,6 +160,7 @@ const CreatePostPage = ({ token, setPage }) => {
       // Step 4: Send the request to create the post
       const postRes = await fetch(`${API_URL}/posts`, {
         method: 'POST',
+        credentials: 'include',
         headers: {
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${token}`
@@ -27,8 +27,8 @@ const EditPostPage = ({ token, setPage, postId }) => {
   useEffect(() => {
     // Fetch both the specific post and the list of all categories at the same time
     Promise.all([
-      fetch(`${API_URL}/posts/${postId}`),
-      fetch(`${API_URL}/categories`)
+      fetch(`${API_URL}/posts/${postId}`, { credentials: 'include' }),
+      fetch(`${API_URL}/categories`, { credentials: 'include' })
     ])
     .then(async ([postRes, catRes]) => {
       if (!postRes.ok) {
@@ -113,6 +113,7 @@ const EditPostPage = ({ token, setPage, postId }) => {
     try {
       const res = await fetch(`${API_URL}/posts/${postId}`, {
         method: 'PUT',
+        credentials: 'include',
         headers: {
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${token}`
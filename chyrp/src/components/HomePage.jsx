@@ -50,7 +50,7 @@ const HomePage = ({ setPage, currentUserId, token, onPostDeleted }) => {
             url.searchParams.append('tag', debouncedTagQuery);
         }
 
-        fetch(url.toString(), { signal })
+        fetch(url.toString(), { signal, credentials: 'include' })
             .then(res => res.ok ? res.json() : Promise.reject('Failed to fetch posts'))
             .then(data => {
                 setPosts(prevPosts => [...prevPosts, ...data.posts]);
@@ -85,6 +85,7 @@ const HomePage = ({ setPage, currentUserId, token, onPostDeleted }) => {
         if (window.confirm("Are you sure you want to delete this post?")) {
             fetch(`${API_URL}/posts/${postId}`, {
                 method: 'DELETE',
+                credentials: 'include',
                 headers: { 'Authorization': `Bearer ${token}` }
             })
             .then(res => {
@@ -27,6 +27,7 @@ const LikeButton = ({ postId, initialLikeCount, initialLikedByUser, token }) =>
 
         fetch(`${API_URL}/posts/${postId}/like`, {
             method: 'POST',
+            credentials: 'include',
             headers: {
                 'Authorization': `Bearer ${token}`
             }
@@ -31,7 +31,7 @@ const PostDetailPage = ({ postId, setPage, currentUserId, token }) => {
         if (token) {
           headers['Authorization'] = `Bearer ${token}`;
         }
-        const response = await fetch(`${API_URL}/posts/${postId}?_=${Date.now()}`, { headers, cache: 'no-store' });
+        const response = await fetch(`${API_URL}/posts/${postId}?_=${Date.now()}`, { headers, cache: 'no-store', credentials: 'include' });
         if (!response.ok) throw new Error('Failed to fetch post');
         const data = await response.json();
         if (isMounted) {
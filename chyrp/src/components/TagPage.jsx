@@ -12,7 +12,7 @@ const TagPage = ({ tagName, setPage, currentUserId, token }) => {
         if (!tagName) return;
 
         // Fetch posts for the specific tag
-        fetch(`${API_URL}/posts/tag/${tagName}`)
+        fetch(`${API_URL}/posts/tag/${tagName}`, { credentials: 'include' })
             .then(res => res.ok ? res.json() : Promise.reject('Failed to fetch posts for this tag.'))
             .then(data => {
                 setPosts(data);
@@ -28,6 +28,7 @@ const TagPage = ({ tagName, setPage, currentUserId, token }) => {
         if (window.confirm("Are you sure you want to delete this post?")) {
             fetch(`${API_URL}/posts/${postId}`, {
                 method: 'DELETE',
+                credentials: 'include',
                 headers: { 'Authorization': `Bearer ${token}` }
             })
             .then(res => res.ok ? res.json() : res.json().then(err => Promise.reject(err)))
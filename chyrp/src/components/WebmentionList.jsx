@@ -10,7 +10,7 @@ const WebmentionList = ({ postId }) => {
     useEffect(() => {
         const fetchWebmentions = async () => {
             try {
-                const res = await fetch(`${API_URL}/posts/${postId}/webmentions`);
+                const res = await fetch(`${API_URL}/posts/${postId}/webmentions`, { credentials: 'include' });
                 if (!res.ok) {
                     const errorText = await res.text();
                     throw new Error(`Failed to fetch webmentions: ${res.status} ${errorText}`);
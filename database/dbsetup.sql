@@ -10,6 +10,11 @@
 /*
 DROP TRIGGER IF EXISTS update_posts_updated_at ON posts;
 DROP FUNCTION IF EXISTS update_updated_at_column();
+DROP TABLE IF EXISTS post_popularity;
+DROP TABLE IF EXISTS view_rollup_state;
+DROP TABLE IF EXISTS post_views_daily;
+DROP TABLE IF EXISTS post_views_hourly;
+DROP TABLE IF EXISTS post_view_events;
 DROP TABLE IF EXISTS webmentions;
 DROP TABLE IF EXISTS post_views;
 DROP TABLE IF EXISTS post_likes;
@@ -67,6 +72,8 @@ CREATE TABLE IF NOT EXISTS posts (
     type VARCHAR(20) NOT NULL CHECK (type IN ('text', 'photo', 'video', 'audio', 'quote', 'link')),
     title TEXT,
     content TEXT,
+    content_html TEXT, -- content rendered from markdown and sanitized at write time
+    excerpt TEXT, -- Plain-text teaser for feed cards
     link_url TEXT,
     attribution TEXT,
     license VARCHAR(255),
@@ -76,9 +83,15 @@ CREATE TABLE IF NOT EXISTS posts (
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Columns added after the first release (no-ops on a fresh database)
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS content_html TEXT;
+ALTER TABLE posts ADD COLUMN IF NOT EXISTS excerpt TEXT;
+
 -- -------------------------------------------------------------
 -- Trigger: update_posts_updated_at
 -- Automatically updates the updated_at timestamp on posts.
+-- Re-rendering content_html without changing content (the
+-- `flask render-posts` backfill) does not count as an update.
 -- -------------------------------------------------------------
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$
@@ -88,9 +101,12 @@ BEGIN
 END;
 $$ language 'plpgsql';
 
+DROP TRIGGER IF EXISTS update_posts_updated_at ON posts;
 CREATE TRIGGER update_posts_updated_at
 BEFORE UPDATE ON posts
 FOR EACH ROW
+-- Maintenance jobs that shouldn't count as edits (e.g. render-posts) opt out with SET LOCAL chyrp.skip_touch = 'on'
+WHEN (current_setting('chyrp.skip_touch', true) IS DISTINCT FROM 'on')
 EXECUTE FUNCTION update_updated_at_column();
 
 -- -------------------------------------------------------------
@@ -129,14 +145,59 @@ CREATE TABLE IF NOT EXISTS post_likes (
     PRIMARY KEY (user_id, post_id)
 );
 
--- Table: post_views (Tracks views to prevent multiple counts from the same user)
-CREATE TABLE IF NOT EXISTS post_views (
-    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+-- Table: post_view_events (Append-only log of post views, including anonymous ones)
+-- Range-partitioned by UTC day. The app's rollup_view_events job creates the daily
+-- partitions (post_view_events_pYYYYMMDD) ahead of time and drops them once they have been
+-- rolled up and are older than VIEW_EVENTS_RETENTION_DAYS. The default partition only
+-- catches rows if that job falls behind. No foreign keys, so inserts stay cheap.
+CREATE TABLE IF NOT EXISTS post_view_events (
+    post_id INTEGER NOT NULL,
+    user_id INTEGER, -- NULL for anonymous views
+    viewed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP
+) PARTITION BY RANGE (viewed_at);
+CREATE TABLE IF NOT EXISTS post_view_events_default PARTITION OF post_view_events DEFAULT;
+
+-- Tables: post_views_hourly / post_views_daily (Per-post view rollups, with the post's author denormalized)
+CREATE TABLE IF NOT EXISTS post_views_hourly (
     post_id INTEGER NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
-    viewed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    PRIMARY KEY (user_id, post_id)
+    author_id INTEGER NOT NULL,
+    hour TIMESTAMP WITH TIME ZONE NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    anonymous_views INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (post_id, hour)
 );
 
+CREATE TABLE IF NOT EXISTS post_views_daily (
+    post_id INTEGER NOT NULL REFERENCES posts(id) ON DELETE CASCADE,
+    author_id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    views INTEGER NOT NULL DEFAULT 0,
+    anonymous_views INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (post_id, day)
+);
+
+-- Table: view_rollup_state (Single row: events before rolled_up_to are already in the rollups)
+CREATE TABLE IF NOT EXISTS view_rollup_state (
+    id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    rolled_up_to TIMESTAMP WITH TIME ZONE NOT NULL
+);
+INSERT INTO view_rollup_state (rolled_up_to) VALUES ('-infinity') ON CONFLICT (id) DO NOTHING;
+
+-- Migration: the old post_views table (one row per user and post) becomes daily rollups.
+-- posts.view_count already includes these views, so only the rollups are filled.
+DO $$
+BEGIN
+    IF to_regclass('public.post_views') IS NOT NULL THEN
+        INSERT INTO post_views_daily (post_id, author_id, day, views)
+        SELECT v.post_id, p.user_id, (v.viewed_at AT TIME ZONE 'UTC')::date, COUNT(*)
+        FROM post_views v
+        JOIN posts p ON p.id = v.post_id
+        GROUP BY v.post_id, p.user_id, (v.viewed_at AT TIME ZONE 'UTC')::date
+        ON CONFLICT (post_id, day) DO NOTHING;
+        DROP TABLE post_views;
+    END IF;
+END $$;
+
 -- Table: webmentions (Stores incoming webmentions for posts)
 CREATE TABLE IF NOT EXISTS webmentions (
     id SERIAL PRIMARY KEY,
@@ -150,7 +211,35 @@ CREATE TABLE IF NOT EXISTS webmentions (
     content TEXT,
     verified BOOLEAN DEFAULT false,
     received_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    published_at TIMESTAMP WITH TIME ZONE -- The timestamp of the source publication
+    published_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP -- Source publication time, or arrival if unknown
+);
+
+-- Migration: older databases allowed NULL published_at and duplicate (source_url, target_url) rows.
+-- Missing publication times fall back to arrival time, and only the newest copy of a duplicate is kept.
+UPDATE webmentions SET published_at = COALESCE(received_at, CURRENT_TIMESTAMP) WHERE published_at IS NULL;
+ALTER TABLE webmentions ALTER COLUMN published_at SET DEFAULT CURRENT_TIMESTAMP;
+ALTER TABLE webmentions ALTER COLUMN published_at SET NOT NULL;
+DELETE FROM webmentions older
+USING webmentions newer
+WHERE older.source_url = newer.source_url
+  AND older.target_url = newer.target_url
+  AND older.id < newer.id;
+
+-- Table: post_popularity (Precomputed trending ranking, maintained by refresh_popular_posts)
+-- Holds one row per post from the last POPULAR_WINDOW_DAYS with its engagement counts,
+-- time-decayed score and dense ranks, so a page of /posts/popular is a rank range scan.
+CREATE TABLE IF NOT EXISTS post_popularity (
+    post_id INTEGER PRIMARY KEY REFERENCES posts(id) ON DELETE CASCADE,
+    category_id INTEGER,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    likes INTEGER NOT NULL DEFAULT 0,
+    comments INTEGER NOT NULL DEFAULT 0,
+    webmentions INTEGER NOT NULL DEFAULT 0,
+    views INTEGER NOT NULL DEFAULT 0,
+    score DOUBLE PRECISION NOT NULL DEFAULT 0,
+    site_rank INTEGER,
+    category_rank INTEGER,
+    refreshed_at TIMESTAMP WITH TIME ZONE NOT NULL
 );
 
 -- -------------------------------------------------------------
@@ -162,7 +251,20 @@ CREATE INDEX IF NOT EXISTS idx_posts_category_id ON posts(category_id);
 CREATE INDEX IF NOT EXISTS idx_post_tags_tag_id ON post_tags(tag_id);
 CREATE INDEX IF NOT EXISTS idx_comments_post_id ON comments(post_id);
 CREATE INDEX IF NOT EXISTS idx_post_media_post_id ON post_media(post_id);
-CREATE INDEX IF NOT EXISTS idx_webmentions_post_id ON webmentions(post_id);
+DROP INDEX IF EXISTS idx_webmentions_post_id; -- Superseded by idx_webmentions_post_published
+CREATE INDEX IF NOT EXISTS idx_webmentions_post_published ON webmentions(post_id, published_at DESC, id DESC);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_webmentions_source_target ON webmentions(source_url, target_url);
+CREATE INDEX IF NOT EXISTS idx_post_likes_post_id ON post_likes(post_id);
+CREATE INDEX IF NOT EXISTS idx_post_likes_created_at ON post_likes(created_at);
+CREATE INDEX IF NOT EXISTS idx_comments_created_at ON comments(created_at);
+CREATE INDEX IF NOT EXISTS idx_posts_updated_at ON posts(updated_at);
+CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts(created_at);
+CREATE INDEX IF NOT EXISTS idx_posts_category_created_at ON posts(category_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_post_popularity_site_rank ON post_popularity(site_rank);
+CREATE INDEX IF NOT EXISTS idx_post_popularity_category_rank ON post_popularity(category_id, category_rank);
+CREATE INDEX IF NOT EXISTS idx_post_views_hourly_author_hour ON post_views_hourly(author_id, hour);
+CREATE INDEX IF NOT EXISTS idx_post_views_hourly_hour ON post_views_hourly(hour);
+CREATE INDEX IF NOT EXISTS idx_post_views_daily_author_day ON post_views_daily(author_id, day);
 
 -- -------------------------------------------------------------
 -- CHANGE OWNERSHIP TO 'p1'